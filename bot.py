@@ -0,0 +1,183 @@
+import asyncio
+import json
+import logging
+from functools import partial
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.base import BaseStorage
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from aiogram.types import (
+    BotCommand,
+)
+
+from config import (
+    BOT_MODE,
+    BOT_TOKEN,
+    FSM_DATA_TTL,
+    FSM_KEY_PREFIX,
+    FSM_STATE_TTL,
+    PRODUCT_INDEX_PATH,
+    REDIS_URL,
+    REMINDERS_ENABLED,
+)
+
+from database import engine, init_models, replica_engine, run_replica_health_check
+from handlers import (
+    profile,
+    progress,
+    start,
+    water,
+    cancel,
+    food,
+    workout,
+    history,
+    report,
+    reminders,
+)
+
+from middlewares.database import DbSessionMiddleware
+from middlewares.logger import CommandLoggerMiddleware
+from middlewares.metrics import MetricsMiddleware
+from middlewares.outbound import OutboundLaneMiddleware
+from middlewares.throttling import ThrottlingMiddleware
+from services.charts import shutdown_chart_workers
+from services.http import http_client
+from services.journal import journal
+from services.metrics import instrument_engine, start_metrics_server
+from services.outbound import OutboundRequestMiddleware, outbound_queue
+from services.partitions import run_partition_maintenance
+from services.product_index import load_product_index
+from services.redis_client import close_redis
+from services.reminders import reminder_scheduler
+from services.rollups import run_rollups
+from utils import listen_user_invalidations
+from webhook import run_webhook
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+# Фоновые задачи, которые живут вместе с ботом и отменяются при остановке
+_background_tasks: list[asyncio.Task] = []
+
+
+async def on_startup(bot: Bot):
+    commands = [
+        BotCommand(command="start", description="Старт"),
+        BotCommand(command="set_profile", description="Настройка профиля"),
+        BotCommand(command="log_water", description="Запись воды"),
+        BotCommand(command="log_food", description="Запись еды"),
+        BotCommand(command="log_workout", description="Запись тренировки"),
+        BotCommand(command="check_progress", description="Проверка прогресса"),
+        BotCommand(command="progress_chart", description="График прогресса"),
+        BotCommand(command="report", description="Отчёт за неделю или месяц"),
+        BotCommand(command="reminders", description="Напоминания о воде"),
+        BotCommand(command="history", description="История записей"),
+        BotCommand(command="export", description="Выгрузка истории в CSV"),
+        BotCommand(command="cancel", description="Отмена действия"),
+    ]
+    await bot.set_my_commands(commands)
+
+    await http_client.start()
+    await outbound_queue.start()
+    await journal.start()
+    load_product_index(PRODUCT_INDEX_PATH)
+    _background_tasks.append(asyncio.create_task(run_partition_maintenance(engine)))
+    _background_tasks.append(asyncio.create_task(listen_user_invalidations()))
+    _background_tasks.append(asyncio.create_task(run_rollups(engine)))
+    _background_tasks.append(asyncio.create_task(run_replica_health_check()))
+    if REMINDERS_ENABLED:
+        _background_tasks.append(asyncio.create_task(reminder_scheduler.run(bot)))
+
+
+async def on_shutdown(bot: Bot):
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
+
+    await journal.stop()
+    await outbound_queue.stop()
+    shutdown_chart_workers()
+    await http_client.close()
+    await close_redis()
+
+
+def create_storage() -> BaseStorage:
+    """Redis-хранилище FSM, если задан REDIS_URL, иначе — в памяти процесса."""
+    if not REDIS_URL:
+        return MemoryStorage()
+
+    return RedisStorage.from_url(
+        REDIS_URL,
+        key_builder=DefaultKeyBuilder(prefix=FSM_KEY_PREFIX, with_destiny=True),
+        state_ttl=FSM_STATE_TTL or None,
+        data_ttl=FSM_DATA_TTL or None,
+        # Компактный JSON: без пробелов и без \uXXXX для кириллицы
+        json_dumps=partial(json.dumps, ensure_ascii=False, separators=(",", ":")),
+        json_loads=json.loads,
+    )
+
+
+def create_dispatcher(storage: BaseStorage, *, throttle: bool = True) -> Dispatcher:
+    dp = Dispatcher(storage=storage)
+
+    if throttle:
+        # Внешний middleware: лишние обновления отсекаются до фильтров и FSM
+        throttling = ThrottlingMiddleware()
+        dp.message.outer_middleware(throttling)
+        dp.callback_query.outer_middleware(throttling)
+    dp.message.middleware(MetricsMiddleware())
+    dp.callback_query.middleware(MetricsMiddleware())
+    dp.message.middleware(CommandLoggerMiddleware())
+    dp.message.middleware(OutboundLaneMiddleware())
+    dp.callback_query.middleware(OutboundLaneMiddleware())
+    # Сессия БД — внутри метрик, чтобы commit входил во время хендлера
+    dp.message.middleware(DbSessionMiddleware())
+    dp.callback_query.middleware(DbSessionMiddleware())
+
+    dp.include_router(cancel.router)
+    dp.include_router(start.router)
+    dp.include_router(profile.router)
+    dp.include_router(water.router)
+    dp.include_router(food.router)
+    dp.include_router(workout.router)
+    dp.include_router(progress.router)
+    dp.include_router(report.router)
+    dp.include_router(reminders.router)
+    dp.include_router(history.router)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+    return dp
+
+
+async def main() -> None:
+    instrument_engine(engine)
+    if replica_engine is not None:
+        instrument_engine(replica_engine)
+    await init_models()
+
+    bot = Bot(token=BOT_TOKEN, default=DefaultBotProperties(parse_mode=ParseMode.HTML))
+    bot.session.middleware(OutboundRequestMiddleware())
+    storage = create_storage()
+    dp = create_dispatcher(storage)
+    metrics_runner = await start_metrics_server()
+
+    try:
+        if BOT_MODE == "webhook":
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
+    finally:
+        if metrics_runner is not None:
+            await metrics_runner.cleanup()
+        await storage.close()
+
@@ -6,3 +6,139 @@ load_dotenv()
 BOT_TOKEN = os.getenv("BOT_TOKEN", "")
 DATABASE_URL = os.getenv("DATABASE_URL", "",)
 WEATHER_API_KEY = os.getenv("WEATHER_API_KEY", "")
+REDIS_URL = os.getenv("REDIS_URL", "")
+
+# Движок БД: лог SQL и пул соединений (настройки пула — только для Postgres)
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "yes")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))  # 0 — для pgbouncer
+
+# Реплика для чтения (пусто — всё читается из основной БД).
+# При отставании больше REPLICA_MAX_LAG секунд чтение возвращается на основную.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+REPLICA_MAX_LAG = float(os.getenv("REPLICA_MAX_LAG", "5"))
+REPLICA_CHECK_INTERVAL = int(os.getenv("REPLICA_CHECK_INTERVAL", "10"))
+
+# Режим получения обновлений: polling или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_BASE_URL = os.getenv("WEBHOOK_BASE_URL", "")  # пусто — не регистрировать вебхук в Telegram
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBAPP_HOST = os.getenv("WEBAPP_HOST", "0.0.0.0")
+WEBAPP_PORT = int(os.getenv("WEBAPP_PORT", "8080"))
+WEBHOOK_MAX_CONCURRENCY = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "100"))
+WEBHOOK_DRAIN_TIMEOUT = int(os.getenv("WEBHOOK_DRAIN_TIMEOUT", "30"))
+
+# FSM-хранилище: при заданном REDIS_URL состояния диалогов живут в Redis
+FSM_KEY_PREFIX = os.getenv("FSM_KEY_PREFIX", "fsm")
+FSM_STATE_TTL = int(os.getenv("FSM_STATE_TTL", "86400"))
+FSM_DATA_TTL = int(os.getenv("FSM_DATA_TTL", "86400"))
+
+# Партиции логов: сколько месяцев создавать вперёд и сколько хранить (0 — вечно)
+PARTITION_MONTHS_AHEAD = int(os.getenv("PARTITION_MONTHS_AHEAD", "2"))
+LOG_RETENTION_MONTHS = int(os.getenv("LOG_RETENTION_MONTHS", "0"))
+PARTITION_MAINTENANCE_INTERVAL = int(os.getenv("PARTITION_MAINTENANCE_INTERVAL", "21600"))
+
+# Кэш снимков прогресса за сегодня (в памяти процесса)
+PROGRESS_CACHE_SIZE = int(os.getenv("PROGRESS_CACHE_SIZE", "10000"))
+PROGRESS_CACHE_TTL = int(os.getenv("PROGRESS_CACHE_TTL", "3600"))
+
+# Общий HTTP-клиент для внешних API
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "100"))
+HTTP_POOL_SIZE_PER_HOST = int(os.getenv("HTTP_POOL_SIZE_PER_HOST", "20"))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+OPENWEATHER_TIMEOUT = float(os.getenv("OPENWEATHER_TIMEOUT", "5"))
+OPENWEATHER_CONCURRENCY = int(os.getenv("OPENWEATHER_CONCURRENCY", "10"))
+OPENFOODFACTS_TIMEOUT = float(os.getenv("OPENFOODFACTS_TIMEOUT", "15"))
+OPENFOODFACTS_CONCURRENCY = int(os.getenv("OPENFOODFACTS_CONCURRENCY", "10"))
+
+# Кэш погоды по городам: свежесть и максимальный возраст устаревшего значения
+WEATHER_CACHE_TTL = int(os.getenv("WEATHER_CACHE_TTL", "1800"))
+WEATHER_STALE_TTL = int(os.getenv("WEATHER_STALE_TTL", "21600"))
+WEATHER_CACHE_SIZE = int(os.getenv("WEATHER_CACHE_SIZE", "5000"))
+
+# Кэш продуктов: в памяти (LRU) + таблица products; промахи живут меньше
+PRODUCT_CACHE_SIZE = int(os.getenv("PRODUCT_CACHE_SIZE", "5000"))
+PRODUCT_CACHE_TTL = int(os.getenv("PRODUCT_CACHE_TTL", "604800"))
+PRODUCT_MISS_TTL = int(os.getenv("PRODUCT_MISS_TTL", "21600"))
+
+# Индекс названий продуктов для нечёткого поиска (scripts/build_product_index.py)
+PRODUCT_INDEX_PATH = os.getenv("PRODUCT_INDEX_PATH", "data/product_index.bin")
+PRODUCT_INDEX_MIN_SCORE = float(os.getenv("PRODUCT_INDEX_MIN_SCORE", "0.5"))
+
+# OpenFoodFacts: общий дедлайн поиска, задержка перед глобальным запросом
+# и параметры автомата защиты (circuit breaker)
+OPENFOODFACTS_DEADLINE = float(os.getenv("OPENFOODFACTS_DEADLINE", "8"))
+OPENFOODFACTS_HEDGE_DELAY = float(os.getenv("OPENFOODFACTS_HEDGE_DELAY", "1"))
+OPENFOODFACTS_FAILURE_THRESHOLD = int(os.getenv("OPENFOODFACTS_FAILURE_THRESHOLD", "5"))
+OPENFOODFACTS_RESET_TIMEOUT = float(os.getenv("OPENFOODFACTS_RESET_TIMEOUT", "30"))
+
+# Отложенная запись логов: журнал на диске + пакетная вставка в БД.
+# Каждому процессу бота нужен свой JOURNAL_DIR.
+WRITE_BEHIND_ENABLED = os.getenv("WRITE_BEHIND_ENABLED", "false").lower() in ("1", "true", "yes")
+JOURNAL_DIR = os.getenv("JOURNAL_DIR", "data/journal")
+JOURNAL_FLUSH_SIZE = int(os.getenv("JOURNAL_FLUSH_SIZE", "500"))
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "1"))
+JOURNAL_FSYNC = os.getenv("JOURNAL_FSYNC", "true").lower() in ("1", "true", "yes")
+# Сегмент, который столько раз не удалось перенести (не из-за связи с БД),
+# откладывается в JOURNAL_DIR/failed, чтобы не задерживать следующие.
+JOURNAL_MAX_ATTEMPTS = int(os.getenv("JOURNAL_MAX_ATTEMPTS", "5"))
+# Сколько дней хранить отметки journal_segments; должно быть больше самого
+# долгого простоя процесса, иначе replay может задвоить сегмент.
+JOURNAL_SEGMENT_RETENTION_DAYS = int(os.getenv("JOURNAL_SEGMENT_RETENTION_DAYS", "30"))
+
+# Кэш профилей пользователей
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "100000"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "600"))
+PROFILE_INVALIDATION_CHANNEL = os.getenv("PROFILE_INVALIDATION_CHANNEL", "profile_invalidate")
+
+# Графики прогресса: число процессов отрисовки и размер кэша file_id
+CHART_WORKERS = int(os.getenv("CHART_WORKERS", "2"))
+CHART_CACHE_SIZE = int(os.getenv("CHART_CACHE_SIZE", "10000"))
+
+# Часовой пояс пользователя, чей город не найден в services.timezones
+DEFAULT_TIMEZONE = os.getenv("DEFAULT_TIMEZONE", "Europe/Moscow")
+
+# Недельные и месячные свёртки для /report
+ROLLUP_INTERVAL = int(os.getenv("ROLLUP_INTERVAL", "60"))
+REPORT_PERIODS = int(os.getenv("REPORT_PERIODS", "8"))
+
+# Напоминания о воде. Планировщик должен работать только в одном процессе бота.
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes")
+REMINDER_INTERVAL_MINUTES = int(os.getenv("REMINDER_INTERVAL_MINUTES", "120"))
+REMINDER_QUIET_START = int(os.getenv("REMINDER_QUIET_START", "22"))
+REMINDER_QUIET_END = int(os.getenv("REMINDER_QUIET_END", "8"))
+REMINDER_LOAD_AHEAD = int(os.getenv("REMINDER_LOAD_AHEAD", "600"))  # окно подгрузки, сек
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+# Повтор напоминания после сбоя отправки: первая пауза (удваивается), число повторов
+REMINDER_RETRY_DELAY = int(os.getenv("REMINDER_RETRY_DELAY", "30"))
+REMINDER_SEND_RETRIES = int(os.getenv("REMINDER_SEND_RETRIES", "3"))
+
+# Очередь исходящих сообщений: лимиты Telegram на бота и на чат
+OUTBOUND_WORKERS = int(os.getenv("OUTBOUND_WORKERS", "8"))
+OUTBOUND_GLOBAL_RATE = float(os.getenv("OUTBOUND_GLOBAL_RATE", "30"))
+OUTBOUND_CHAT_RATE = float(os.getenv("OUTBOUND_CHAT_RATE", "1"))
+OUTBOUND_CHAT_BURST = int(os.getenv("OUTBOUND_CHAT_BURST", "3"))
+OUTBOUND_MAX_RETRIES = int(os.getenv("OUTBOUND_MAX_RETRIES", "3"))
+
+# Антифлуд: корзина токенов на пару (пользователь, команда).
+# THROTTLE_LIMITS — "команда=токенов_в_секунду/запас" через запятую;
+# "*" — ответы в диалогах, "callback" — нажатия кнопок.
+THROTTLE_RATE = float(os.getenv("THROTTLE_RATE", "1"))
+THROTTLE_BURST = int(os.getenv("THROTTLE_BURST", "5"))
+THROTTLE_LIMITS = os.getenv(
+    "THROTTLE_LIMITS",
+    "check_progress=0.5/3,log_food=0.2/3,progress_chart=0.1/2,report=0.1/3,export=0.02/1",
+)
+THROTTLE_CACHE_SIZE = int(os.getenv("THROTTLE_CACHE_SIZE", "100000"))
+THROTTLE_IDLE_TTL = int(os.getenv("THROTTLE_IDLE_TTL", "600"))
+THROTTLE_SHARED = os.getenv("THROTTLE_SHARED", "false").lower() in ("1", "true", "yes")
+
+# Метрики Prometheus на отдельном локальном порту (0 — выключить)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))
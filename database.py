@@ -1,14 +1,188 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+import asyncio
+import inspect
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
-from config import DATABASE_URL
+from config import (
+    DATABASE_REPLICA_URL,
+    DATABASE_URL,
+    DB_ECHO,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_STATEMENT_CACHE_SIZE,
+    REPLICA_CHECK_INTERVAL,
+    REPLICA_MAX_LAG,
+)
+
+from models.models import Base, DailyTotal
+from services.partitions import ensure_partitions
+
+logger = logging.getLogger("database")
+
 
-from models.models import Base
+def engine_options(url: str) -> dict:
+    """Параметры движка из конфига; настройки пула — только для Postgres."""
+    options = {"echo": DB_ECHO}
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "postgresql":
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # 0 — для pgbouncer в режиме transaction: подготовленные запросы
+        # живут в соединении, а соединения там меняются между транзакциями.
+        options["connect_args"] = {"statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+    return options
 
-engine = create_async_engine(DATABASE_URL, echo=True)  # echo=True → лог SQL
+
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(url, **engine_options(url))
+
+
+engine = create_engine(DATABASE_URL)
+replica_engine: Optional[AsyncEngine] = (
+    create_engine(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+)
 
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+ReplicaSessionLocal = (
+    sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    if replica_engine is not None
+    else None
+)
+
+
+class ReplicaHealth:
+    """Состояние реплики по последней проверке отставания."""
+
+    def __init__(self):
+        self.healthy = False
+        self.lag: Optional[float] = None
+
+    def _set(self, healthy: bool, reason: str = "") -> None:
+        if healthy != self.healthy:
+            if healthy:
+                logger.info(f"✅ Реплика доступна, отставание {self.lag:.1f} с")
+            else:
+                logger.warning(f"⚠️ Чтение переключено на основную БД: {reason}")
+        self.healthy = healthy
+
+    async def check(self) -> None:
+        try:
+            async with replica_engine.connect() as conn:
+                # Реплика, догнавшая основную БД, отстаёт на 0 — даже если
+                # последняя транзакция была давно.
+                result = await conn.execute(
+                    text(
+                        "SELECT COALESCE(CASE "
+                        "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() "
+                        "THEN 0 "
+                        "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+                        "END, 0)"
+                    )
+                )
+                self.lag = float(result.scalar())
+        except Exception as e:
+            self.lag = None
+            self._set(False, f"ошибка проверки реплики: {e}")
+            return
+        if self.lag > REPLICA_MAX_LAG:
+            self._set(False, f"отставание {self.lag:.1f} с")
+        else:
+            self._set(True)
+
+
+replica_health = ReplicaHealth()
+
+# Пользователи, недавно писавшие в основную БД: их чтения тоже идут в основную,
+# пока реплика не догонит (иначе в кэш попадут устаревшие данные).
+_recent_writers = TTLCache(maxsize=100_000, ttl=REPLICA_MAX_LAG + REPLICA_CHECK_INTERVAL)
+
+
+def mark_written(telegram_id: int) -> None:
+    if replica_engine is not None:
+        _recent_writers[telegram_id] = True
+
+
+def _use_replica(telegram_id: Optional[int]) -> bool:
+    return (
+        ReplicaSessionLocal is not None
+        and replica_health.healthy
+        and telegram_id not in _recent_writers
+    )
+
+
+def read_session(telegram_id: Optional[int] = None) -> AsyncSession:
+    """Сессия только для чтения: реплика, если она здорова, иначе основная БД."""
+    if _use_replica(telegram_id):
+        return ReplicaSessionLocal()
+    return AsyncSessionLocal()
+
+
+@asynccontextmanager
+async def read_scope(
+    session: Optional[AsyncSession], telegram_id: Optional[int] = None
+) -> AsyncIterator[AsyncSession]:
+    """Для чтения: реплика, если она здорова; иначе переданная сессия
+    обновления (без второго соединения из пула); иначе новая сессия."""
+    if session is not None and not _use_replica(telegram_id):
+        yield session
+        return
+    async with read_session(telegram_id) as own:
+        yield own
+
+
+def after_commit(session: AsyncSession, callback: Callable[[], Any]) -> None:
+    """Выполнить callback (функцию или корутину) после коммита сессии:
+    обновление кэшей и mark_written — только для сохранённых данных."""
+    session.info.setdefault("after_commit", []).append(callback)
+
+
+async def commit_session(session: AsyncSession) -> None:
+    await session.commit()
+    for callback in session.info.pop("after_commit", []):
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+
+
+async def rollback_session(session: AsyncSession) -> None:
+    session.info.pop("after_commit", None)
+    await session.rollback()
+
+
+async def run_replica_health_check(interval: int = REPLICA_CHECK_INTERVAL) -> None:
+    """Фоновая задача: проверяет отставание реплики."""
+    if replica_engine is None:
+        return
+    while True:
+        await replica_health.check()
+        await asyncio.sleep(interval)
 
 
 async def init_models():
     async with engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Триграммный индекс для поиска по каталогу продуктов
+            await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
         await conn.run_sync(Base.metadata.create_all)
+        # create_all не добавляет индексы в уже существующие таблицы
+        for index in DailyTotal.__table__.indexes:
+            await conn.run_sync(
+                lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True)
+            )
+        await ensure_partitions(conn)
@@ -1,136 +1,67 @@
-import aiohttp
 from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from datetime import datetime, timezone
-from sqlalchemy import func, select
+from config import PRODUCT_INDEX_MIN_SCORE
 from states.states import FoodStates
-from models.models import FoodLog, WorkoutLog
-from database import AsyncSessionLocal
+from services.catalog import search_catalog
+from services.circuit_breaker import CLOSED
+from services.entries import save_food
+from services.openfoodfacts import breaker, search_openfoodfacts
+from services.product_index import search_product_index
+from services.products import get_cached_product, normalize_query, store_product
 
-import json
 import logging
 
 from utils import get_user_profile
 
 router = Router()
 
-# Кэш для продуктов (опционально, чтобы не спамить API)
-_product_cache = {}
-
 # Настройка логгера (можно использовать общий)
 logger = logging.getLogger("food_api")
 
+# Порог похожести названия, когда OpenFoodFacts недоступен
+DEGRADED_INDEX_MIN_SCORE = 0.3
 
-async def search_openfoodfacts(product_name: str) -> dict | None:
-    """Ищет продукт в OpenFoodFacts с фокусом на Россию + подробное логирование"""
-    if product_name in _product_cache:
-        return _product_cache[product_name]
-
-    url = "https://world.openfoodfacts.org/cgi/search.pl"
-
-    params = {
-        "search_terms": product_name,
-        "search_simple": 1,
-        "json": 1,
-        "page_size": 5,
-        "tagtype_0": "countries",
-        "tag_contains_0": "russia",
-        "sort_by": "unique_scans_n",
-    }
-
-    logger.info(f"🔍 Запрос к OpenFoodFacts: {product_name}")
-    logger.debug(f"URL: {url}")
-    logger.debug(f"Params: {params}")
-
-    try:
-        timeout = aiohttp.ClientTimeout(total=15)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.get(url, params=params) as response:
-                logger.info(f"📡 Ответ от OpenFoodFacts: статус {response.status}")
-
-                if response.status != 200:
-                    logger.warning(f"❌ Некорректный статус: {response.status}")
-                    return None
-
-                try:
-                    text = await response.text()
-                    # Логируем первые 500 символов тела (осторожно: может быть большим)
-                    logger.debug(f"📄 Тело ответа (первые 500 симв): {text[:500]}...")
-                    data = json.loads(text)
-                except json.JSONDecodeError as e:
-                    logger.error(f"❌ Ошибка парсинга JSON: {e}")
-                    logger.debug(f"Полный ответ: {text[:1000]}")
-                    return None
-
-                products = data.get("products", [])
-                logger.info(f"📦 Найдено продуктов: {len(products)}")
-
-                if not products:
-                    # Fallback: глобальный поиск
-                    logger.info("🔄 Попытка глобального поиска (без фильтра России)")
-                    fallback_params = {
-                        "search_terms": product_name,
-                        "search_simple": 1,
-                        "json": 1,
-                        "page_size": 1,
-                    }
-                    async with session.get(url, params=fallback_params) as resp2:
-                        logger.info(f"📡 Fallback-ответ: статус {resp2.status}")
-                        if resp2.status == 200:
-                            try:
-                                fallback_data = await resp2.json()
-                                products = fallback_data.get("products", [])
-                                logger.info(
-                                    f"📦 Fallback: найдено {len(products)} продуктов"
-                                )
-                            except Exception as e2:
-                                logger.error(f"❌ Ошибка fallback-парсинга: {e2}")
-                        else:
-                            logger.warning(f"❌ Fallback вернул статус {resp2.status}")
-
-                for i, product in enumerate(products):
-                    name = (
-                        product.get("product_name_ru")
-                        or product.get("product_name")
-                        or ""
-                    ).strip()
-
-                    nutriments = product.get("nutriments", {})
-                    energy_kcal = nutriments.get("energy-kcal_100g")
-
-                    if energy_kcal is None:
-                        energy_kcal = nutriments.get("energy_100g")
-                        if energy_kcal:
-                            energy_kcal = round(energy_kcal / 4.184)
-
-                    logger.debug(f"  [{i}] {name} → {energy_kcal} ккал/100г")
-
-                    if name and energy_kcal and energy_kcal > 0:
-                        result = {"name": name, "calories_per_100g": int(energy_kcal)}
-                        _product_cache[product_name] = result
-                        logger.info(f"✅ Найден продукт: {result}")
-                        return result
-
-                logger.warning("❌ Подходящих продуктов с калориями не найдено")
-                return None
-
-    except aiohttp.ClientError as e:
-        logger.error(f"🌐 Ошибка сети при запросе к OpenFoodFacts: {e}")
-        return None
-    except Exception as e:
-        logger.exception(f"💥 Неожиданная ошибка в search_openfoodfacts: {e}")
+
+async def find_product(product_name: str) -> dict | None:
+    """Кэш продуктов → индекс названий → локальный каталог → OpenFoodFacts."""
+    query = normalize_query(product_name)
+    if not query:
         return None
 
+    cached, product = await get_cached_product(query)
+    if cached:
+        logger.debug(f"✅ Кэш продуктов hit: {query!r} → {product}")
+        return product
+
+    product = search_product_index(query, PRODUCT_INDEX_MIN_SCORE)
+    if product:
+        logger.info(f"📇 Найден в индексе продуктов: {product}")
+        await store_product(query, product)
+        return product
+
+    product = await search_catalog(query)
+    if product:
+        logger.info(f"📚 Найден в локальном каталоге: {product}")
+        await store_product(query, product)
+        return product
+
+    product = await search_openfoodfacts(product_name)
+    if product is None and breaker.state != CLOSED:
+        # OpenFoodFacts деградировал — соглашаемся на менее точное совпадение
+        product = search_product_index(query, DEGRADED_INDEX_MIN_SCORE)
+    return product
+
 
 @router.message(Command("log_food"))
-async def cmd_log_food(message: Message, state: FSMContext):
+async def cmd_log_food(message: Message, state: FSMContext, session: AsyncSession):
     args = message.text.split(maxsplit=1)
     telegram_id = message.from_user.id
 
-    profile = await get_user_profile(telegram_id)
+    profile = await get_user_profile(telegram_id, session)
 
     if not profile:
         await message.answer("❌ Сначала настрой профиль: /set_profile")
@@ -138,7 +69,10 @@ async def cmd_log_food(message: Message, state: FSMContext):
 
     if len(args) > 1:
         product_name = args[1].strip()
-        food_info = await search_openfoodfacts(product_name)
+        # Поиск может ждать OpenFoodFacts до нескольких секунд — соединение
+        # и транзакцию чтения профиля на это время не держим
+        await session.close()
+        food_info = await find_product(product_name)
         if not food_info:
             await message.answer(
                 f"❌ Не удалось найти продукт «{product_name}».\n"
@@ -163,7 +97,7 @@ async def cmd_log_food(message: Message, state: FSMContext):
 @router.message(FoodStates.name)
 async def process_food_name(message: Message, state: FSMContext):
     product_name = message.text.strip()
-    food_info = await search_openfoodfacts(product_name)
+    food_info = await find_product(product_name)
 
     if not food_info:
         await message.answer(
@@ -183,7 +117,9 @@ async def process_food_name(message: Message, state: FSMContext):
 
 
 @router.message(FoodStates.weight)
-async def process_food_weight(message: Message, state: FSMContext):
+async def process_food_weight(
+    message: Message, state: FSMContext, session: AsyncSession
+):
     text = message.text.strip()
     if not text.isdigit() or not (10 <= int(text) <= 5000):
         await message.answer("❌ Укажите вес от 10 до 5000 грамм.")
@@ -196,6 +132,7 @@ async def process_food_weight(message: Message, state: FSMContext):
     total_calories = round(calories_per_100g * weight / 100)
 
     await _save_food_entry(
+        session,
         telegram_id=message.from_user.id,
         name=name,
         weight=weight,
@@ -206,56 +143,37 @@ async def process_food_weight(message: Message, state: FSMContext):
 
 
 async def _save_food_entry(
+    session: AsyncSession,
     telegram_id: int,
     name: str,
     weight: int,
     calories: int,
     message: Message,
 ):
-    async with AsyncSessionLocal() as session:
-        user = await get_user_profile(telegram_id)
+    user = await get_user_profile(telegram_id, session)
 
-        if not user:
-            await message.answer("❌ Сначала настрой профиль: /set_profile")
-            return
+    if not user:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
 
-        new_log = FoodLog(
-            telegram_id=telegram_id,
-            name=name,
-            weight=weight,
-            calories=calories,
-        )
-        session.add(new_log)
-        await session.commit()
+    totals = await save_food(
+        session, user, name=name, weight=weight, calories=calories
+    )
 
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        total_result = await session.execute(
-            select(func.sum(FoodLog.calories))
-            .where(FoodLog.telegram_id == telegram_id)
-            .where(FoodLog.logged_at >= today_start)
-        )
-        total_calories_today = total_result.scalar() or 0
+    total_calories_today = totals.calories_eaten
+    total_burned_calories_today = totals.calories_burned
 
-        goal = user.calorie_goal
-        remaining = max(0, goal - total_calories_today)
+    goal = user.calorie_goal
+    remaining = max(0, goal - total_calories_today)
 
-        total_result_burned_calories = await session.execute(
-            select(func.sum(WorkoutLog.calories_burned))
-            .where(WorkoutLog.telegram_id == telegram_id)
-            .where(WorkoutLog.logged_at >= today_start)
-        )
-        total_burned_calories_today = total_result_burned_calories.scalar() or 0
-        
-        status = (
-            "✅ Вы уложились в норму!"
-            if remaining == 0
-            else f"📉 Осталось: {remaining + total_burned_calories_today} ккал"
-        )
+    status = (
+        "✅ Вы уложились в норму!"
+        if remaining == 0
+        else f"📉 Осталось: {remaining + total_burned_calories_today} ккал"
+    )
 
-        await message.answer(
-            f"✅ Записано: {calories} ккал ({weight} г {name.lower()})\n"
-            f"📊 Сегодня: {total_calories_today} / {goal + total_burned_calories_today} ккал\n"
-            f"{status}"
-        )
+    await message.answer(
+        f"✅ Записано: {calories} ккал ({weight} г {name.lower()})\n"
+        f"📊 Сегодня: {total_calories_today} / {goal + total_burned_calories_today} ккал\n"
+        f"{status}"
+    )
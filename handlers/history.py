@@ -0,0 +1,171 @@
+import asyncio
+import csv
+import io
+import os
+import tempfile
+from html import escape
+from datetime import datetime, timedelta, timezone
+
+from aiogram import Router
+from aiogram.filters import Command
+from aiogram.filters.callback_data import CallbackData
+from aiogram.types import (
+    CallbackQuery,
+    FSInputFile,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    Message,
+)
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.history import (
+    FOOD,
+    WATER,
+    HistoryCursor,
+    HistoryEntry,
+    get_history_page,
+    stream_history,
+)
+from services.timezones import get_zone
+from utils import get_user_profile
+
+router = Router()
+
+PAGE_SIZE = 10
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class HistoryPage(CallbackData, prefix="history"):
+    # Курсор (logged_at, source, id) последней показанной записи
+    at: int
+    source: int
+    id: int
+
+
+def _format_entry(entry: HistoryEntry, zone) -> str:
+    when = entry.logged_at.astimezone(zone).strftime("%d.%m.%Y %H:%M")
+    if entry.source == WATER:
+        return f"💧 {when} — вода {entry.quantity} мл"
+    if entry.source == FOOD:
+        return (
+            f"🍽️ {when} — {escape(entry.name)}, {entry.quantity} г, "
+            f"{entry.calories} ккал"
+        )
+    return (
+        f"🏋️ {when} — {escape(entry.name)}, {entry.quantity} мин, "
+        f"−{entry.calories} ккал"
+    )
+
+
+def _next_page_markup(cursor: HistoryCursor | None) -> InlineKeyboardMarkup | None:
+    if cursor is None:
+        return None
+    callback = HistoryPage(
+        at=(cursor.logged_at - _EPOCH) // _MICROSECOND,
+        source=cursor.source,
+        id=cursor.id,
+    )
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="⬇️ Ещё", callback_data=callback.pack())]
+        ]
+    )
+
+
+async def _history_page(
+    session: AsyncSession, profile, after: HistoryCursor | None
+):
+    entries, next_cursor = await get_history_page(
+        session, profile.telegram_id, after, PAGE_SIZE
+    )
+    # Время записей — по местному времени пользователя
+    zone = get_zone(profile.timezone)
+    text = "\n".join(_format_entry(entry, zone) for entry in entries)
+    return text, _next_page_markup(next_cursor)
+
+
+@router.message(Command("history"))
+async def cmd_history(message: Message, session: AsyncSession):
+    telegram_id = message.from_user.id
+
+    profile = await get_user_profile(telegram_id, session)
+    if not profile:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    text, markup = await _history_page(session, profile, None)
+    if not text:
+        await message.answer("📭 Записей пока нет.")
+        return
+    await message.answer(f"📜 <b>История</b>\n\n{text}", reply_markup=markup)
+
+
+@router.callback_query(HistoryPage.filter())
+async def history_next_page(
+    callback: CallbackQuery, callback_data: HistoryPage, session: AsyncSession
+):
+    after = HistoryCursor(
+        _EPOCH + callback_data.at * _MICROSECOND,
+        callback_data.source,
+        callback_data.id,
+    )
+    profile = await get_user_profile(callback.from_user.id, session)
+    if not profile:
+        await callback.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+    text, markup = await _history_page(session, profile, after)
+
+    # Кнопку со старой страницы убираем, чтобы не листать её повторно
+    await callback.message.edit_reply_markup(reply_markup=None)
+    if text:
+        await callback.message.answer(text, reply_markup=markup)
+    await callback.answer()
+
+
+def _write_rows(file, rows: list[list]) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    file.write(buffer.getvalue())
+
+
+@router.message(Command("export"), flags={"outbound": "interactive"})
+async def cmd_export(message: Message, session: AsyncSession):
+    telegram_id = message.from_user.id
+
+    if not await get_user_profile(telegram_id, session):
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    await message.answer("⏳ Готовлю файл с историей...")
+
+    kinds = {WATER: "вода", FOOD: "еда"}
+    fd, path = tempfile.mkstemp(prefix="history_", suffix=".csv")
+    try:
+        # utf-8-sig — чтобы Excel правильно открыл кириллицу
+        with open(fd, "w", encoding="utf-8-sig", newline="") as file:
+            _write_rows(
+                file, [["type", "logged_at", "name", "quantity", "calories"]]
+            )
+            async for entries in stream_history(session, telegram_id):
+                rows = [
+                    [
+                        kinds.get(entry.source, "тренировка"),
+                        entry.logged_at.isoformat(),
+                        entry.name or "",
+                        entry.quantity,
+                        entry.calories if entry.calories is not None else "",
+                    ]
+                    for entry in entries
+                ]
+                # Запись на диск — вне event loop
+                await asyncio.to_thread(_write_rows, file, rows)
+        # Соединение не держим, пока файл ждёт в очереди отправки
+        await session.close()
+
+        await message.answer_document(
+            FSInputFile(path, filename=f"daily_dose_history_{telegram_id}.csv")
+        )
+    finally:
+        os.remove(path)
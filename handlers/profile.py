@@ -3,14 +3,16 @@ from aiogram.types import Message, ReplyKeyboardRemove
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from services.timezones import timezone_for_city
 from services.weather import get_temperature
 from states.states import ProfileStates
 from models.models import User
-from database import AsyncSessionLocal
+from database import after_commit, mark_written, read_scope, rollback_session
 import re
 
-from utils import invalidate_user_cache
+from utils import broadcast_user_invalidation
 
 router = Router()
 
@@ -50,37 +52,38 @@ def calculate_goals(
     )
 
 
-async def get_user_from_db(telegram_id: int):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(
+async def get_user_from_db(telegram_id: int, session: AsyncSession):
+    async with read_scope(session, telegram_id) as reader:
+        result = await reader.execute(
             select(User).where(User.telegram_id == telegram_id)
         )
         return result.scalar_one_or_none()
 
 
-async def save_user_to_db(user_data: dict, message: Message):
-    async with AsyncSessionLocal() as session:
-        telegram_id = user_data["telegram_id"]
-        existing = await session.get(User, telegram_id)
-        if existing:
-            # Обновляем
-            for key, value in user_data.items():
-                if hasattr(existing, key):
-                    setattr(existing, key, value)
-        else:
-            # Создаём нового
-            new_user = User(**user_data)
-            session.add(new_user)
-        await session.commit()
-        invalidate_user_cache(message.from_user.id)
+async def save_user_to_db(user_data: dict, session: AsyncSession):
+    telegram_id = user_data["telegram_id"]
+    existing = await session.get(User, telegram_id)
+    if existing:
+        # Обновляем
+        for key, value in user_data.items():
+            if hasattr(existing, key):
+                setattr(existing, key, value)
+    else:
+        # Создаём нового
+        new_user = User(**user_data)
+        session.add(new_user)
+    # Ошибки БД — сейчас, пока ещё можно ответить «не сохранено»
+    await session.flush()
+    after_commit(session, lambda: mark_written(telegram_id))
+    after_commit(session, lambda: broadcast_user_invalidation(telegram_id))
 
 
 @router.message(Command("set_profile"))
-async def cmd_set_profile(message: Message, state: FSMContext):
+async def cmd_set_profile(message: Message, state: FSMContext, session: AsyncSession):
     telegram_id = message.from_user.id
 
     # Проверяем наличие в БД
-    user_in_db = await get_user_from_db(telegram_id)
+    user_in_db = await get_user_from_db(telegram_id, session)
 
     if user_in_db:
         gender_display = (
@@ -170,6 +173,9 @@ async def process_activity(message: Message, state: FSMContext):
     city_temp = None
     if data["city"]:
         city_temp = await get_temperature(data["city"])
+    if city_temp is None:
+        # Погода недоступна (нет ключа API или ошибка) — считаем без надбавки
+        city_temp = 20
 
     (
         calorie_goal,
@@ -234,7 +240,9 @@ async def process_calorie_goal(message: Message, state: FSMContext):
 
 
 @router.message(ProfileStates.water_goal)
-async def process_water_goal(message: Message, state: FSMContext):
+async def process_water_goal(
+    message: Message, state: FSMContext, session: AsyncSession
+):
     text = message.text.strip().lower()
     data = await state.get_data()
 
@@ -256,14 +264,16 @@ async def process_water_goal(message: Message, state: FSMContext):
         "age": data["age"],
         "gender": data["gender"],
         "city": data["city"],
+        "timezone": timezone_for_city(data["city"]),
         "activity_minutes": data["activity_minutes"],
         "calorie_goal": data["calorie_goal"],
         "water_goal": water_goal,
     }
 
     try:
-        await save_user_to_db(user_data, message)
+        await save_user_to_db(user_data, session)
     except Exception as e:
+        await rollback_session(session)
         await message.answer("⚠️ Ошибка сохранения профиля. Попробуйте позже.")
         print(f"DB Error: {e}")
         return
@@ -1,29 +1,27 @@
-from datetime import datetime, timezone
 from aiogram import Router
-from aiogram.types import Message
-from aiogram.filters import Command
+from aiogram.types import BufferedInputFile, Message
+from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import func, select
-
-from models.models import FoodLog, WaterLog, WorkoutLog
-from database import AsyncSessionLocal
-
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from services.charts import (
+    chart_cache_key,
+    get_cached_chart,
+    load_chart_series,
+    remember_chart,
+    render_chart,
+)
+from services.progress import get_progress
 from utils import get_user_profile
 
 router = Router()
 
 
 @router.message(Command("check_progress"))
-async def cmd_check_progress(message: Message, state: FSMContext):
-    telegram_id = message.from_user.id
-
-    user = await get_user_profile(telegram_id)
-
-    if not user:
-        await message.answer("❌ Сначала настрой профиль: /set_profile")
-        return
-
-    await _progress(telegram_id, message)
+async def cmd_check_progress(
+    message: Message, state: FSMContext, session: AsyncSession
+):
+    await _progress(message.from_user.id, message, session)
 
 
 # 📊 Прогресс:
@@ -37,49 +35,68 @@ async def cmd_check_progress(message: Message, state: FSMContext):
 # - Баланс: 1400 ккал.
 
 
-async def _progress(telegram_id: int, message: Message):
-    async with AsyncSessionLocal() as session:
-        user = await get_user_profile(telegram_id)
-
-        if not user:
-            await message.answer("❌ Сначала настрой профиль: /set_profile")
-            return
-
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        total_today_water = await session.execute(
-            select(func.sum(WaterLog.quantity))
-            .where(WaterLog.telegram_id == telegram_id)
-            .where(WaterLog.logged_at >= today_start)
-        )
-        total_water_today = total_today_water.scalar() or 0
-        water_goal = user.water_goal
-        remaining_water = max(0, water_goal - total_water_today)
-
-        total_result_calories = await session.execute(
-            select(func.sum(FoodLog.calories))
-            .where(FoodLog.telegram_id == telegram_id)
-            .where(FoodLog.logged_at >= today_start)
-        )
-        total_calories_today = total_result_calories.scalar() or 0
-        calories_goal = user.calorie_goal
-        remaining_calories = max(0, calories_goal - total_calories_today)
-
-        total_result_burned_calories = await session.execute(
-            select(func.sum(WorkoutLog.calories_burned))
-            .where(WorkoutLog.telegram_id == telegram_id)
-            .where(WorkoutLog.logged_at >= today_start)
-        )
-        total_burned_calories_today = total_result_burned_calories.scalar() or 0
-
-        await message.answer(
-            "📊 <b>Прогресс:</b>\n\n"
-            "💧 <b>Вода</b>\n"
-            f"  Выпито: {total_water_today} / {water_goal} мл\n"
-            f"  Осталось: {remaining_water} мл\n\n"
-            "🔥 <b>Калории</b>\n"
-            f"  Потреблено: {total_calories_today} / {calories_goal + total_burned_calories_today} ккал\n"
-            f"  Сожжено: {total_burned_calories_today} ккал\n"
-            f"  Осталось: {remaining_calories + total_burned_calories_today} ккал"
-        )
+async def _progress(telegram_id: int, message: Message, session: AsyncSession):
+    profile = await get_user_profile(telegram_id, session)
+    progress = await get_progress(profile, session) if profile else None
+
+    if not progress:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    total_water_today = progress.water_ml
+    water_goal = progress.water_goal
+    remaining_water = max(0, water_goal - total_water_today)
+
+    total_calories_today = progress.calories_eaten
+    calories_goal = progress.calorie_goal
+    remaining_calories = max(0, calories_goal - total_calories_today)
+
+    total_burned_calories_today = progress.calories_burned
+
+    await message.answer(
+        "📊 <b>Прогресс:</b>\n\n"
+        "💧 <b>Вода</b>\n"
+        f"  Выпито: {total_water_today} / {water_goal} мл\n"
+        f"  Осталось: {remaining_water} мл\n\n"
+        "🔥 <b>Калории</b>\n"
+        f"  Потреблено: {total_calories_today} / {calories_goal + total_burned_calories_today} ккал\n"
+        f"  Сожжено: {total_burned_calories_today} ккал\n"
+        f"  Осталось: {remaining_calories + total_burned_calories_today} ккал"
+    )
+
+
+CHART_RANGES = (7, 30)
+
+
+@router.message(Command("progress_chart"), flags={"outbound": "interactive"})
+async def cmd_progress_chart(
+    message: Message, command: CommandObject, session: AsyncSession
+):
+    days = int(command.args) if command.args and command.args.strip().isdigit() else 7
+    if days not in CHART_RANGES:
+        await message.answer("❌ Укажи период: /progress_chart 7 или /progress_chart 30")
+        return
+
+    telegram_id = message.from_user.id
+    profile = await get_user_profile(telegram_id, session)
+    progress = await get_progress(profile, session) if profile else None
+    if not progress:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    caption = f"📈 Прогресс за {days} дней"
+    key = chart_cache_key(progress, days)
+    file_id = get_cached_chart(telegram_id, days, key)
+    if file_id:
+        # Картинка уже загружена в Telegram — отправляем по file_id
+        await message.answer_photo(file_id, caption=caption)
+        return
+
+    series = await load_chart_series(session, telegram_id, progress, days)
+    # Соединение не держим ни во время отрисовки, ни в очереди отправки
+    await session.close()
+    png = await render_chart(series)
+    sent = await message.answer_photo(
+        BufferedInputFile(png, filename="progress.png"), caption=caption
+    )
+    remember_chart(telegram_id, days, key, sent.photo[-1].file_id)
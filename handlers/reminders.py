@@ -0,0 +1,96 @@
+import re
+
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import REMINDER_INTERVAL_MINUTES, REMINDER_QUIET_END, REMINDER_QUIET_START
+from services.reminders import (
+    ReminderSettings,
+    get_reminder_settings,
+    save_reminder_settings,
+)
+from utils import get_user_profile
+
+router = Router()
+
+_QUIET_RE = re.compile(r"^(\d{1,2})\s*-\s*(\d{1,2})$")
+
+USAGE = (
+    "⏰ <b>Напоминания о воде</b>\n"
+    "/reminders on [минуты] — включить (интервал 30–720 мин)\n"
+    "/reminders off — выключить\n"
+    "/reminders quiet 22-8 — тихие часы"
+)
+
+
+def _format_settings(settings: ReminderSettings) -> str:
+    status = "включены ✅" if settings.enabled else "выключены ❌"
+    return (
+        f"⏰ Напоминания {status}\n"
+        f"  Интервал: {settings.interval_minutes} мин\n"
+        f"  Тихие часы: {settings.quiet_start}:00–{settings.quiet_end}:00\n"
+        "Напоминаю, только пока дневная норма воды не выполнена."
+    )
+
+
+@router.message(Command("reminders"))
+async def cmd_reminders(
+    message: Message, command: CommandObject, session: AsyncSession
+):
+    telegram_id = message.from_user.id
+
+    profile = await get_user_profile(telegram_id, session)
+    if not profile:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    args = (command.args or "").split(maxsplit=1)
+    action = args[0].lower() if args else ""
+    value = args[1].strip() if len(args) > 1 else ""
+
+    if not action:
+        settings = await get_reminder_settings(session, telegram_id) or ReminderSettings(
+            False, REMINDER_INTERVAL_MINUTES, REMINDER_QUIET_START, REMINDER_QUIET_END, None
+        )
+        await message.answer(f"{_format_settings(settings)}\n\n{USAGE}")
+        return
+
+    if action == "on":
+        interval = None
+        if value:
+            if not value.isdigit() or not (30 <= int(value) <= 720):
+                await message.answer("❌ Интервал: 30–720 минут")
+                return
+            interval = int(value)
+        settings = await save_reminder_settings(
+            session,
+            telegram_id,
+            enabled=True,
+            interval_minutes=interval,
+            tz=profile.timezone,
+        )
+    elif action == "off":
+        settings = await save_reminder_settings(
+            session, telegram_id, enabled=False, tz=profile.timezone
+        )
+    elif action == "quiet":
+        match = _QUIET_RE.match(value)
+        if not match or not all(0 <= int(hour) <= 23 for hour in match.groups()):
+            await message.answer("❌ Укажи часы так: /reminders quiet 22-8")
+            return
+        current = await get_reminder_settings(session, telegram_id)
+        settings = await save_reminder_settings(
+            session,
+            telegram_id,
+            enabled=current.enabled if current else False,
+            quiet_start=int(match[1]),
+            quiet_end=int(match[2]),
+            tz=profile.timezone,
+        )
+    else:
+        await message.answer(USAGE)
+        return
+
+    await message.answer(_format_settings(settings))
@@ -0,0 +1,100 @@
+from aiogram import Router
+from aiogram.filters import Command, CommandObject
+from aiogram.types import Message
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from services.rollups import PeriodReport, get_period_reports
+from utils import get_user_profile
+
+router = Router()
+
+# Аргумент команды → период свёртки
+PERIOD_ALIASES = {
+    "week": "week",
+    "неделя": "week",
+    "month": "month",
+    "месяц": "month",
+}
+PERIOD_TITLES = {"week": "неделю", "month": "месяц"}
+PREVIOUS_TITLES = {"week": "прошлой неделей", "month": "прошлым месяцем"}
+
+
+def _percent(part: int, total: int) -> int:
+    return round(part * 100 / total) if total else 0
+
+
+def _trend(current: int, previous: int, unit: str) -> str:
+    delta = current - previous
+    if delta > 0:
+        return f"↑ +{delta} {unit}"
+    if delta < 0:
+        return f"↓ −{-delta} {unit}"
+    return "→ без изменений"
+
+
+def _format_report(period: str, reports: list[PeriodReport]) -> str:
+    current = reports[0]
+    water = current.average(current.water_ml)
+    eaten = current.average(current.calories_eaten)
+    burned = current.average(current.calories_burned)
+
+    lines = [
+        f"📅 <b>Отчёт за {PERIOD_TITLES[period]}</b> "
+        f"(с {current.period_start:%d.%m.%Y})",
+        f"Дней с записями: {current.days_logged}",
+        "",
+        f"💧 Вода: в среднем {water} мл/день",
+        f"  Норма выполнена: {current.water_goal_days} из {current.days_logged} "
+        f"дн. ({_percent(current.water_goal_days, current.days_logged)}%)",
+        f"🔥 Калории: в среднем {eaten} ккал/день, сожжено {burned} ккал/день",
+        f"  В пределах нормы: {current.calorie_goal_days} из {current.days_logged} "
+        f"дн. ({_percent(current.calorie_goal_days, current.days_logged)}%)",
+    ]
+
+    if len(reports) > 1:
+        previous = reports[1]
+        lines += [
+            "",
+            f"📈 <b>По сравнению с {PREVIOUS_TITLES[period]}</b>",
+            f"  Вода: {_trend(water, previous.average(previous.water_ml), 'мл')}",
+            "  Калории: "
+            + _trend(eaten, previous.average(previous.calories_eaten), "ккал"),
+        ]
+
+        lines += ["", "🗂 <b>Средние по периодам</b> (вода / калории)"]
+        for report in reports:
+            lines.append(
+                f"  {report.period_start:%d.%m.%Y}: "
+                f"{report.average(report.water_ml)} мл / "
+                f"{report.average(report.calories_eaten)} ккал"
+            )
+
+    return "\n".join(lines)
+
+
+@router.message(Command("report"), flags={"outbound": "interactive"})
+async def cmd_report(
+    message: Message, command: CommandObject, session: AsyncSession
+):
+    arg = (command.args or "week").strip().lower()
+    period = PERIOD_ALIASES.get(arg)
+    if period is None:
+        await message.answer("❌ Укажи период: /report week или /report month")
+        return
+
+    telegram_id = message.from_user.id
+    if not await get_user_profile(telegram_id, session):
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
+
+    reports = await get_period_reports(session, telegram_id, period)
+    # Соединение не держим, пока ответ ждёт в очереди отправки
+    await session.close()
+
+    if not reports:
+        await message.answer(
+            "📭 Данных для отчёта пока нет — они появляются через пару минут "
+            "после первых записей."
+        )
+        return
+    await message.answer(_format_report(period, reports))
@@ -2,12 +2,10 @@ from aiogram import Router
 from aiogram.types import Message
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
-from sqlalchemy import func, select
-from datetime import datetime, timezone
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from states.states import WorkoutStates
-from models.models import WaterLog, WorkoutLog
-from database import AsyncSessionLocal
+from services.entries import save_workout
 from utils import get_user_profile
 
 router = Router()
@@ -29,10 +27,10 @@ def parse_workout_args(text: str):
 
 
 @router.message(Command("log_workout"))
-async def cmd_log_workout(message: Message, state: FSMContext):
+async def cmd_log_workout(message: Message, state: FSMContext, session: AsyncSession):
     telegram_id = message.from_user.id
 
-    user = await get_user_profile(telegram_id)
+    user = await get_user_profile(telegram_id, session)
     if not user:
         await message.answer("❌ Сначала настрой профиль: /set_profile")
         return
@@ -44,6 +42,7 @@ async def cmd_log_workout(message: Message, state: FSMContext):
         if parsed:
             kind, duration, calories_burned = parsed
             await _save_workout_entry(
+                session,
                 telegram_id=telegram_id,
                 kind=kind,
                 duration=duration,
@@ -82,7 +81,7 @@ async def process_duration(message: Message, state: FSMContext):
 
 
 @router.message(WorkoutStates.calories_burned)
-async def process_calorie(message: Message, state: FSMContext):
+async def process_calorie(message: Message, state: FSMContext, session: AsyncSession):
     try:
         calories_burned = int(message.text.strip())
         if calories_burned < 0:
@@ -93,6 +92,7 @@ async def process_calorie(message: Message, state: FSMContext):
 
     data = await state.get_data()
     await _save_workout_entry(
+        session,
         telegram_id=message.from_user.id,
         kind=data["kind"],
         duration=data["duration"],
@@ -103,44 +103,33 @@ async def process_calorie(message: Message, state: FSMContext):
 
 
 async def _save_workout_entry(
+    session: AsyncSession,
     telegram_id: int,
     kind: str,
     duration: int,
     calories_burned: int,
     message: Message,
 ):
-    async with AsyncSessionLocal() as session:
-        user = await get_user_profile(telegram_id)
-        if not user:
-            await message.answer("❌ Сначала настрой профиль: /set_profile")
-            return
+    user = await get_user_profile(telegram_id, session)
+    if not user:
+        await message.answer("❌ Сначала настрой профиль: /set_profile")
+        return
 
-        new_log = WorkoutLog(
-            telegram_id=telegram_id,
-            kind=kind,
-            duration=duration,
-            calories_burned=calories_burned,
-        )
-        session.add(new_log)
-        await session.commit()
-
-        today_start = datetime.now(timezone.utc).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        total_result = await session.execute(
-            select(func.sum(WorkoutLog.calories_burned))
-            .where(WorkoutLog.telegram_id == telegram_id)
-            .where(WorkoutLog.logged_at >= today_start)
-        )
-        total_burned = total_result.scalar() or 0
-
-        quantity = duration / 30 * 200
-        new_log = WaterLog(telegram_id=telegram_id, quantity=quantity)
-        session.add(new_log)
-        await session.commit()
-
-        await message.answer(
-            f"✅ Записано: {calories_burned} ккал ({duration} мин, {kind.lower()})\n"
-            f"🔥 Сегодня потрачено: {total_burned} ккал\n"
-            f"Дополнительно: добавляется 200 мл воды за каждые 30 минут."
-        )
+    # Тренировка и вода за неё — в одной транзакции обновления
+    quantity = round(duration / 30 * 200)
+    totals = await save_workout(
+        session,
+        user,
+        kind=kind,
+        duration=duration,
+        calories_burned=calories_burned,
+        water_ml=quantity,
+    )
+
+    total_burned = totals.calories_burned
+
+    await message.answer(
+        f"✅ Записано: {calories_burned} ккал ({duration} мин, {kind.lower()})\n"
+        f"🔥 Сегодня потрачено: {total_burned} ккал\n"
+        f"Дополнительно: добавляется 200 мл воды за каждые 30 минут."
+    )
@@ -0,0 +1,30 @@
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+from typing import Callable, Dict, Any, Awaitable
+
+from database import AsyncSessionLocal, commit_session, rollback_session
+
+
+class DbSessionMiddleware(BaseMiddleware):
+    """Одна сессия БД на обновление — в хендлер приходит аргументом session.
+
+    Соединение берётся из пула только при первом запросе, поэтому хендлерам
+    без БД сессия ничего не стоит. После хендлера — один commit (и колбэки
+    after_commit), при исключении — rollback.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        async with AsyncSessionLocal() as session:
+            data["session"] = session
+            try:
+                result = await handler(event, data)
+            except Exception:
+                await rollback_session(session)
+                raise
+            await commit_session(session)
+            return result
@@ -0,0 +1,27 @@
+from aiogram import BaseMiddleware
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import TelegramObject
+from typing import Callable, Dict, Any, Awaitable
+
+from services.outbound import BULK, INTERACTIVE, outbound_lane
+
+LANES = {"interactive": INTERACTIVE, "bulk": BULK}
+
+
+class OutboundLaneMiddleware(BaseMiddleware):
+    """Хендлеры с флагом outbound отвечают через очередь отправки:
+
+        @router.message(Command("report"), flags={"outbound": "interactive"})
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        lane = get_flag(data, "outbound")
+        if lane is None:
+            return await handler(event, data)
+        with outbound_lane(LANES[lane]):
+            return await handler(event, data)
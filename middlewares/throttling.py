@@ -0,0 +1,143 @@
+import logging
+import math
+from aiogram import BaseMiddleware
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from cachetools import TTLCache
+from typing import Callable, Dict, Any, Awaitable, Optional
+
+from config import (
+    THROTTLE_BURST,
+    THROTTLE_CACHE_SIZE,
+    THROTTLE_IDLE_TTL,
+    THROTTLE_LIMITS,
+    THROTTLE_RATE,
+    THROTTLE_SHARED,
+)
+from services.metrics import throttled_updates
+from services.rate_limit import TokenBucket
+from services.redis_client import get_redis
+
+logger = logging.getLogger("throttling")
+
+# Корзина токенов в Redis: KEYS[1] — ключ, ARGV — rate, burst, ttl (мс).
+# Время берём у Redis, чтобы часы воркеров не расходились.
+_REDIS_BUCKET = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 't', 'u')
+local tokens = tonumber(state[1]) or burst
+local updated = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + (now - updated) * rate)
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    wait = math.ceil((1 - tokens) / rate * 1000)
+end
+redis.call('HSET', KEYS[1], 't', tokens, 'u', now)
+redis.call('PEXPIRE', KEYS[1], ARGV[3])
+return wait
+"""
+
+
+def parse_limits(spec: str) -> dict[str, tuple[float, int]]:
+    """Разбирает строку вида log_food=0.2/3,export=0.02/1 в
+    {команда: (токенов в секунду, запас)}."""
+    limits = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        command, _, limit = item.partition("=")
+        rate, _, burst = limit.partition("/")
+        limits[command.strip().lstrip("/")] = (float(rate), int(burst or 1))
+    return limits
+
+
+def _command_of(event: TelegramObject) -> str:
+    if isinstance(event, CallbackQuery):
+        return "callback"
+    text = (event.text or "") if isinstance(event, Message) else ""
+    if text.startswith("/"):
+        return text[1:].split(maxsplit=1)[0].split("@", 1)[0].lower()
+    # Ответы на вопросы диалогов и прочие сообщения — общий лимит
+    return "*"
+
+
+class ThrottlingMiddleware(BaseMiddleware):
+    """Ограничивает частоту обновлений от пользователя корзиной токенов
+    на пару (пользователь, команда).
+
+    Состояние — TTLCache ограниченного размера, корзины простаивающих
+    пользователей истекают сами. С THROTTLE_SHARED корзины живут в Redis
+    и общие для всех воркеров. Лишние обновления не доходят до хендлеров:
+    на первое из серии отвечаем «подожди», остальные молча отбрасываем.
+    """
+
+    def __init__(
+        self,
+        rate: float = THROTTLE_RATE,
+        burst: int = THROTTLE_BURST,
+        limits: Optional[dict[str, tuple[float, int]]] = None,
+        shared: bool = THROTTLE_SHARED,
+    ):
+        self.default = (rate, burst)
+        self.limits = parse_limits(THROTTLE_LIMITS) if limits is None else limits
+        self.shared = shared
+        self._buckets = TTLCache(maxsize=THROTTLE_CACHE_SIZE, ttl=THROTTLE_IDLE_TTL)
+        # Кому уже ответили «подожди» в текущей серии
+        self._warned = TTLCache(maxsize=THROTTLE_CACHE_SIZE, ttl=THROTTLE_IDLE_TTL)
+        self._script = None
+
+    def _local_wait(self, key: tuple, rate: float, burst: int) -> float:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(rate, burst)
+        # Перезаписываем, чтобы продлить TTL активного пользователя
+        self._buckets[key] = bucket
+        return bucket.reserve()
+
+    async def _wait(self, key: tuple, rate: float, burst: int) -> float:
+        redis = get_redis() if self.shared else None
+        if redis is None:
+            return self._local_wait(key, rate, burst)
+        if self._script is None:
+            self._script = redis.register_script(_REDIS_BUCKET)
+        try:
+            wait_ms = await self._script(
+                keys=[f"throttle:{key[0]}:{key[1]}"],
+                args=[rate, burst, THROTTLE_IDLE_TTL * 1000],
+            )
+            return int(wait_ms) / 1000
+        except Exception as e:
+            logger.warning(f"⚠️ Redis недоступен, лимиты считаем локально: {e}")
+            return self._local_wait(key, rate, burst)
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user is None:
+            return await handler(event, data)
+
+        command = _command_of(event)
+        rate, burst = self.limits.get(command, self.default)
+        key = (user.id, command)
+
+        wait = await self._wait(key, rate, burst)
+        if wait <= 0:
+            self._warned.pop(key, None)
+            return await handler(event, data)
+
+        throttled_updates.inc(command)
+        if key in self._warned:
+            return None
+        self._warned[key] = True
+        logger.info(f"🚦 Пользователь {user.id} ограничен по {command!r} на {wait:.1f} с")
+
+        text = f"⏳ Слишком часто, попробуй через {math.ceil(wait)} с."
+        if isinstance(event, (CallbackQuery, Message)):
+            await event.answer(text)
+        return None
@@ -1,14 +1,19 @@
 from sqlalchemy import (
     BigInteger,
+    Boolean,
     Column,
+    Date,
     Integer,
     String,
     DateTime,
     func,
     ForeignKey,
+    Index,
 )
 from sqlalchemy.ext.declarative import declarative_base
 
+from config import DEFAULT_TIMEZONE
+
 Base = declarative_base()
 
 
@@ -24,36 +29,195 @@ class User(Base):
     activity_minutes = Column(Integer, nullable=False)
     calorie_goal = Column(Integer, nullable=False)
     water_goal = Column(Integer, nullable=False)
+    # IANA-пояс, определяется по городу (services/timezones.py)
+    timezone = Column(String, nullable=False, server_default=DEFAULT_TIMEZONE)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
 
+# Логи партиционированы по месяцам (RANGE по logged_at), поэтому ключ партиции
+# входит в первичный ключ. Партиции создаёт services/partitions.py.
+
+
 class WaterLog(Base):
     __tablename__ = "water_logs"
+    __table_args__ = (
+        Index("ix_water_logs_telegram_id_logged_at", "telegram_id", "logged_at"),
+        Index("ix_water_logs_telegram_id_local_day", "telegram_id", "local_day"),
+        {"postgresql_partition_by": "RANGE (logged_at)"},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
     quantity = Column(Integer, nullable=False)
-    logged_at = Column(DateTime(timezone=True), server_default=func.now())
+    logged_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    local_day = Column(Date, nullable=False)  # дата logged_at в поясе пользователя
 
 
 class FoodLog(Base):
     __tablename__ = "food_logs"
+    __table_args__ = (
+        Index("ix_food_logs_telegram_id_logged_at", "telegram_id", "logged_at"),
+        Index("ix_food_logs_telegram_id_local_day", "telegram_id", "local_day"),
+        {"postgresql_partition_by": "RANGE (logged_at)"},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
     name = Column(String, nullable=False)
     weight = Column(Integer, nullable=False)
     calories = Column(Integer, nullable=False)
-    logged_at = Column(DateTime(timezone=True), server_default=func.now())
+    logged_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    local_day = Column(Date, nullable=False)  # дата logged_at в поясе пользователя
 
 
 class WorkoutLog(Base):
     __tablename__ = "workout_logs"
+    __table_args__ = (
+        Index("ix_workout_logs_telegram_id_logged_at", "telegram_id", "logged_at"),
+        Index("ix_workout_logs_telegram_id_local_day", "telegram_id", "local_day"),
+        {"postgresql_partition_by": "RANGE (logged_at)"},
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     telegram_id = Column(BigInteger, ForeignKey("users.telegram_id"), nullable=False)
     kind = Column(String, nullable=False)
     duration = Column(Integer, nullable=False)
-    logged_at = Column(DateTime(timezone=True), server_default=func.now())
+    logged_at = Column(
+        DateTime(timezone=True), primary_key=True, server_default=func.now()
+    )
+    local_day = Column(Date, nullable=False)  # дата logged_at в поясе пользователя
     calories_burned = Column(Integer, nullable=False)
+
+
+class DailyTotal(Base):
+    """Агрегаты пользователя за день, обновляются вместе с каждой записью в логи."""
+
+    __tablename__ = "daily_totals"
+
+    telegram_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    day = Column(Date, primary_key=True)  # local_day записей логов
+    water_ml = Column(Integer, nullable=False, server_default="0")
+    calories_eaten = Column(Integer, nullable=False, server_default="0")
+    calories_burned = Column(Integer, nullable=False, server_default="0")
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+    __table_args__ = (
+        # Фоновая свёртка выбирает дни, изменённые с прошлого прогона
+        Index("ix_daily_totals_updated_at", "updated_at"),
+    )
+
+
+class Product(Base):
+    """Общий для всех воркеров кэш поиска продуктов (L2 за кэшем в памяти)."""
+
+    __tablename__ = "products"
+
+    query = Column(String, primary_key=True)  # нормализованный запрос
+    name = Column(String, nullable=True)  # NULL — продукт не найден (негативный кэш)
+    calories_per_100g = Column(Integer, nullable=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+
+class CatalogProduct(Base):
+    """Локальная копия каталога OpenFoodFacts (scripts/import_off.py)."""
+
+    __tablename__ = "catalog_products"
+    __table_args__ = (
+        Index(
+            "ix_catalog_products_search_name_trgm",
+            "search_name",
+            postgresql_using="gin",
+            postgresql_ops={"search_name": "gin_trgm_ops"},
+        ),
+    )
+
+    code = Column(String, primary_key=True)  # штрихкод
+    name = Column(String, nullable=False)  # название для показа (русское, если есть)
+    search_name = Column(String, nullable=False)  # нормализованные русское + общее названия
+    calories_per_100g = Column(Integer, nullable=False)
+    is_russian = Column(Boolean, nullable=False, server_default="false")
+    popularity = Column(Integer, nullable=False, server_default="0")
+    last_modified_t = Column(BigInteger, nullable=False)
+
+
+class JournalSegment(Base):
+    """Сегменты журнала отложенной записи, уже перенесённые в БД.
+
+    Отметка пишется в той же транзакции, что и данные сегмента, поэтому
+    повторный replay после сбоя не задваивает записи.
+    """
+
+    __tablename__ = "journal_segments"
+
+    segment_id = Column(String, primary_key=True)
+    flushed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PeriodTotal(Base):
+    """Недельные и месячные свёртки daily_totals для отчётов.
+
+    Пересчитываются фоновой задачей только для периодов, в которых менялись дни.
+    """
+
+    __tablename__ = "period_totals"
+
+    telegram_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    period = Column(String, primary_key=True)  # "week" или "month"
+    period_start = Column(Date, primary_key=True)
+    days_logged = Column(Integer, nullable=False)
+    water_ml = Column(Integer, nullable=False)
+    calories_eaten = Column(Integer, nullable=False)
+    calories_burned = Column(Integer, nullable=False)
+    water_goal_days = Column(Integer, nullable=False)  # дней с выполненной нормой воды
+    calorie_goal_days = Column(Integer, nullable=False)  # дней без превышения калорий
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+
+
+class RollupState(Base):
+    """Отметка, до которой изменения daily_totals уже свёрнуты в period_totals."""
+
+    __tablename__ = "rollup_state"
+
+    name = Column(String, primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=False)
+
+
+class ReminderSchedule(Base):
+    """Расписание напоминаний о воде: одна строка на пользователя."""
+
+    __tablename__ = "reminder_schedules"
+    __table_args__ = (
+        # Планировщик подгружает только ближайшие по времени напоминания
+        Index("ix_reminder_schedules_enabled_next_run_at", "enabled", "next_run_at"),
+    )
+
+    telegram_id = Column(
+        BigInteger,
+        ForeignKey("users.telegram_id"),
+        primary_key=True,
+        autoincrement=False,
+    )
+    enabled = Column(Boolean, nullable=False, server_default="true")
+    interval_minutes = Column(Integer, nullable=False)
+    quiet_start = Column(Integer, nullable=False)  # час начала тихих часов, 0–23
+    quiet_end = Column(Integer, nullable=False)  # час окончания тихих часов, 0–23
+    next_run_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,142 @@
+"""Перевод существующей БД на местные дни пользователей.
+
+1. Создаёт недостающие таблицы (daily_totals, period_totals, rollup_state
+   и др.), если база ещё со старой схемы.
+2. Добавляет колонки users.timezone и local_day в water_logs, food_logs,
+   workout_logs (create_all не меняет существующие таблицы).
+3. Заполняет users.timezone по городу (services/timezones.py).
+4. Заполняет local_day логов — по партиции за транзакцию, чтобы не держать
+   блокировки на всей таблице.
+5. Делает local_day NOT NULL, строит индексы (telegram_id, local_day).
+6. Пересчитывает daily_totals по местным дням и сбрасывает свёртки, чтобы
+   period_totals пересчитались целиком (пустые таблицы тоже подходят).
+
+Только для Postgres. Если логи ещё не партиционированы, запускать до
+scripts.migrate_partitions. Запуск:
+    uv run -m scripts.backfill_local_day [--all]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import bindparam, select, text, update
+
+from config import DEFAULT_TIMEZONE
+from database import AsyncSessionLocal, engine
+from models.models import Base, User
+from services.partitions import PARTITIONED_TABLES, is_partitioned, list_partitions
+from services.timezones import timezone_for_city
+from services.totals import rebuild_daily_totals
+
+logger = logging.getLogger("backfill_local_day")
+
+
+async def create_missing_tables() -> None:
+    # Существующие таблицы create_all не трогает
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+
+async def add_columns() -> None:
+    # В DDL параметры не передаются — экранируем значение из конфига сами
+    default = DEFAULT_TIMEZONE.replace("'", "''")
+    async with engine.begin() as conn:
+        await conn.execute(
+            text(
+                "ALTER TABLE users ADD COLUMN IF NOT EXISTS timezone VARCHAR "
+                f"NOT NULL DEFAULT '{default}'"
+            )
+        )
+        for table in PARTITIONED_TABLES:
+            await conn.execute(
+                text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS local_day DATE")
+            )
+
+
+async def fill_user_timezones() -> None:
+    async with engine.begin() as conn:
+        cities = (await conn.execute(select(User.city).distinct())).scalars().all()
+        if not cities:
+            return
+        await conn.execute(
+            update(User.__table__)
+            .where(User.__table__.c.city == bindparam("b_city"))
+            .values(timezone=bindparam("b_timezone")),
+            [{"b_city": city, "b_timezone": timezone_for_city(city)} for city in cities],
+        )
+    logger.info(f"🌍 Часовые пояса заполнены для городов: {len(cities)}")
+
+
+async def fill_local_day(table: str, only_missing: bool) -> None:
+    async with engine.connect() as conn:
+        if await is_partitioned(conn, table):
+            partitions = await list_partitions(conn, table)
+            targets = [name for _, name in sorted(partitions.items())]
+        else:
+            targets = [table]
+
+    condition = " AND l.local_day IS NULL" if only_missing else ""
+    for target in targets:
+        async with engine.begin() as conn:
+            result = await conn.execute(
+                text(
+                    f"UPDATE {target} AS l "
+                    "SET local_day = (l.logged_at AT TIME ZONE u.timezone)::date "
+                    "FROM users AS u WHERE u.telegram_id = l.telegram_id" + condition
+                )
+            )
+        logger.info(f"📅 {target}: обновлено строк {result.rowcount}")
+
+
+async def finish_schema() -> None:
+    async with engine.begin() as conn:
+        for table in PARTITIONED_TABLES:
+            await conn.execute(
+                text(f"ALTER TABLE {table} ALTER COLUMN local_day SET NOT NULL")
+            )
+            for index in Base.metadata.tables[table].indexes:
+                if "local_day" not in index.columns.keys():
+                    continue
+                await conn.run_sync(
+                    lambda sync_conn, index=index: index.create(sync_conn, checkfirst=True)
+                )
+                logger.info(f"🗂️ Индекс {index.name} готов")
+
+
+async def rebuild_totals() -> None:
+    async with AsyncSessionLocal() as session:
+        # Заодно сбрасывает свёртки: refresh_rollups пересчитает все периоды
+        rows = await rebuild_daily_totals(session)
+        await session.commit()
+    logger.info(f"✅ Пересчитано строк daily_totals: {rows}")
+
+
+async def run(only_missing: bool) -> None:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ Скрипт поддерживается только для Postgres")
+
+    await create_missing_tables()
+    await add_columns()
+    await fill_user_timezones()
+    for table in PARTITIONED_TABLES:
+        await fill_local_day(table, only_missing)
+    await finish_schema()
+    await rebuild_totals()
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="пересчитать local_day у всех записей (например, после правки "
+        "списка городов), а не только у незаполненных",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(only_missing=not args.all))
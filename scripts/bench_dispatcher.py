@@ -0,0 +1,250 @@
+"""Нагрузочный тест обработки обновлений: N пользователей одновременно проходят
+полные диалоги через тот же Dispatcher, что и в bot.py. Запросы к Telegram
+подменены сессией, которая только запоминает ответы.
+
+Только для Postgres и только для локальной БД — скрипт удаляет и заново
+создаёт данные пользователей с id от BENCH_USER_BASE:
+    DATABASE_URL=postgresql+asyncpg://... uv run -m scripts.bench_dispatcher --users 200
+
+Выводит p50/p95/p99 и обновлений в секунду по каждой команде; --json сохраняет
+результат для сравнения между версиями.
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import statistics
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+from aiogram import Bot
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.base import BaseSession
+from aiogram.enums import ParseMode
+from aiogram.fsm.storage.memory import MemoryStorage
+from aiogram.methods import SendMessage
+from aiogram.types import Chat, Message, Update
+from sqlalchemy import delete
+
+from database import engine, init_models
+from bot import create_dispatcher
+from models.models import Base
+from services.journal import journal
+from services.products import normalize_query, store_product
+from services.weather import remember_temperature
+
+logger = logging.getLogger("bench_dispatcher")
+
+BENCH_USER_BASE = 9_000_000_000
+
+CITY = "Москва"
+PRODUCTS = {
+    "банан": {"name": "Банан", "calories_per_100g": 89},
+    "яблоко": {"name": "Яблоко", "calories_per_100g": 52},
+}
+
+PROFILE = [
+    "/set_profile", "70", "175", "30", CITY, "мужчина", "45", "пропустить", "пропустить",
+]
+# Команда → сообщения пользователя в диалоге
+CONVERSATIONS = {
+    "log_water": [["/log_water", "250"], ["/log_water 300"]],
+    "log_food": [["/log_food", "банан", "150"], ["/log_food яблоко", "200"]],
+    "log_workout": [["/log_workout", "бег", "30", "300"], ["/log_workout йога 45 150"]],
+    "check_progress": [["/check_progress"]],
+}
+
+
+class RecordingSession(BaseSession):
+    """Сессия бота без сети: считает запросы и запоминает тексты ответов."""
+
+    def __init__(self):
+        super().__init__()
+        self.calls = Counter()
+        self.replies: dict[int, list[str]] = defaultdict(list)
+        self._message_ids = itertools.count(1)
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls[type(method).__name__] += 1
+        if isinstance(method, SendMessage):
+            self.replies[method.chat_id].append(method.text)
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(timezone.utc),
+                chat=Chat(id=method.chat_id, type="private"),
+                text=method.text,
+            )
+        return True
+
+    async def stream_content(
+        self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True
+    ):
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+def make_update(bot: Bot, update_id: int, user_id: int, text: str) -> Update:
+    return Update.model_validate(
+        {
+            "update_id": update_id,
+            "message": {
+                "message_id": update_id,
+                "date": int(time.time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {
+                    "id": user_id,
+                    "is_bot": False,
+                    "first_name": "Bench",
+                    "username": f"bench{user_id}",
+                },
+                "text": text,
+            },
+        },
+        context={"bot": bot},
+    )
+
+
+class Benchmark:
+    def __init__(self, dp, bot: Bot, session: RecordingSession):
+        self.dp = dp
+        self.bot = bot
+        self.session = session
+        self.update_ids = itertools.count(1)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors = Counter()
+
+    async def _conversation(self, command: str, user_id: int, steps: list[str]) -> None:
+        for text in steps:
+            update = make_update(self.bot, next(self.update_ids), user_id, text)
+            started = time.perf_counter()
+            try:
+                await self.dp.feed_update(self.bot, update)
+            except Exception as e:
+                self.errors[command] += 1
+                logger.error(f"💥 {command} / {text!r}: {e}")
+                return
+            self.latencies[command].append(time.perf_counter() - started)
+
+            replies = self.session.replies.pop(user_id, [])
+            if not replies or replies[-1].startswith(("❌", "⚠️")):
+                self.errors[command] += 1
+                logger.error(f"❌ {command} / {text!r}: {replies[-1:] or 'нет ответа'}")
+                return
+
+    async def run_user(self, user_id: int, rounds: int) -> None:
+        await self._conversation("set_profile", user_id, PROFILE)
+        for _ in range(rounds):
+            for command, conversations in CONVERSATIONS.items():
+                for steps in conversations:
+                    await self._conversation(command, user_id, steps)
+
+
+async def reset_bench_users() -> None:
+    async with engine.begin() as conn:
+        for table in reversed(Base.metadata.sorted_tables):
+            if "telegram_id" in table.c:
+                await conn.execute(
+                    delete(table).where(table.c.telegram_id >= BENCH_USER_BASE)
+                )
+
+
+async def warm_caches() -> None:
+    # Без сетевых запросов к OpenWeather и OpenFoodFacts; температура из кэша
+    # отдаётся и без WEATHER_API_KEY
+    remember_temperature(CITY, 20.0)
+    for query, product in PRODUCTS.items():
+        await store_product(normalize_query(query), product)
+
+
+def _percentiles(values: list[float]) -> tuple[float, float, float]:
+    if len(values) < 2:
+        value = values[0] if values else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(values, n=100)
+    return cuts[49], cuts[94], cuts[98]
+
+
+def report(bench: Benchmark, elapsed: float) -> dict:
+    results = {}
+    print(f"\n{'команда':<16}{'updates':>9}{'ошибок':>8}{'p50 мс':>9}{'p95 мс':>9}"
+          f"{'p99 мс':>9}{'upd/s':>9}")
+    for command, values in bench.latencies.items():
+        p50, p95, p99 = _percentiles(values)
+        results[command] = {
+            "updates": len(values),
+            "errors": bench.errors[command],
+            "p50_ms": round(p50 * 1000, 2),
+            "p95_ms": round(p95 * 1000, 2),
+            "p99_ms": round(p99 * 1000, 2),
+            "updates_per_sec": round(len(values) / elapsed, 1),
+        }
+        row = results[command]
+        print(f"{command:<16}{row['updates']:>9}{row['errors']:>8}{row['p50_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['updates_per_sec']:>9}")
+
+    total = sum(len(values) for values in bench.latencies.values())
+    results["total"] = {
+        "updates": total,
+        "errors": sum(bench.errors.values()),
+        "seconds": round(elapsed, 2),
+        "updates_per_sec": round(total / elapsed, 1),
+        "telegram_calls": dict(bench.session.calls),
+    }
+    print(f"\nВсего: {total} обновлений за {elapsed:.2f} с — "
+          f"{total / elapsed:.1f} обновлений/с, ошибок {results['total']['errors']}")
+    return results
+
+
+async def run(users: int, rounds: int, json_path: str | None) -> None:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ Нагрузочный тест поддерживается только для Postgres")
+
+    await init_models()
+    await reset_bench_users()
+    if journal.enabled:
+        await journal.start()
+    await warm_caches()
+
+    session = RecordingSession()
+    bot = Bot(
+        "42:BENCHMARK",
+        session=session,
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+    # Антифлуд отключён: иначе он и будет измеряться
+    dp = create_dispatcher(MemoryStorage(), throttle=False)
+    bench = Benchmark(dp, bot, session)
+
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(bench.run_user(BENCH_USER_BASE + i, rounds) for i in range(users))
+    )
+    elapsed = time.perf_counter() - started
+
+    if journal.enabled:
+        await journal.stop()
+    await engine.dispose()
+
+    results = report(bench, elapsed)
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=100, help="число пользователей")
+    parser.add_argument(
+        "--rounds", type=int, default=3, help="повторов записи воды/еды/тренировки"
+    )
+    parser.add_argument("--json", default=None, help="сохранить результат в файл")
+    args = parser.parse_args()
+
+    # INFO-логи каждой команды исказили бы замер; bot.py уже настроил логирование
+    logging.basicConfig(level=logging.WARNING, force=True)
+    asyncio.run(run(args.users, args.rounds, args.json))
@@ -0,0 +1,79 @@
+"""Замер нечёткого поиска по индексу названий продуктов (services/product_index).
+
+Индекс загружается из файла, собранного scripts.build_product_index; каждый
+запрос выполняется --repeat раз с тем же порогом, что и в /log_food:
+    uv run -m scripts.bench_product_index
+    uv run -m scripts.bench_product_index "гречкa" "молоко 3,2" --repeat 200
+
+Выводит медиану, p95 и максимум времени запроса в микросекундах.
+"""
+
+import argparse
+import logging
+import statistics
+import time
+
+from config import PRODUCT_INDEX_MIN_SCORE, PRODUCT_INDEX_PATH
+from services.product_index import ProductIndex
+
+logger = logging.getLogger("bench_product_index")
+
+# Частые слова и опечатки: у таких запросов самые длинные списки триграмм
+QUERIES = [
+    "гречкa",
+    "гречка ядрица",
+    "молоко",
+    "молоко 3,2",
+    "малоко",
+    "сыр",
+    "кефир",
+    "творог 5%",
+    "хлеб",
+    "рисс",
+    "йогурт клубничный",
+    "шоколад молочный",
+    "колбаса варёная",
+    "масло сливочное 82",
+    "чай зелёный",
+]
+
+
+def run(path: str, queries: list[str], repeat: int, min_score: float) -> None:
+    started = time.perf_counter()
+    index = ProductIndex.load(path)
+    print(f"Индекс {path}: {len(index)} названий, загрузка "
+          f"{(time.perf_counter() - started) * 1000:.1f} мс\n")
+
+    print(f"{'запрос':<24}{'p50 мкс':>10}{'p95 мкс':>10}{'max мкс':>10}  лучшее совпадение")
+    totals = []
+    for query in queries:
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            matches = index.search(query, limit=1, min_score=min_score)
+            timings.append((time.perf_counter() - started) * 1_000_000)
+        timings.sort()
+        totals.extend(timings)
+        best = f"{matches[0].name} ({matches[0].score})" if matches else "—"
+        print(f"{query:<24}{statistics.median(timings):>10.0f}"
+              f"{timings[int(len(timings) * 0.95)]:>10.0f}{timings[-1]:>10.0f}  {best}")
+
+    totals.sort()
+    print(f"\nВсе запросы: p50 {statistics.median(totals):.0f} мкс, "
+          f"p95 {totals[int(len(totals) * 0.95)]:.0f} мкс, max {totals[-1]:.0f} мкс")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("queries", nargs="*", help="запросы (по умолчанию — набор частых)")
+    parser.add_argument("--index", default=PRODUCT_INDEX_PATH, help="файл индекса")
+    parser.add_argument("--repeat", type=int, default=50, help="повторов каждого запроса")
+    parser.add_argument(
+        "--min-score", type=float, default=PRODUCT_INDEX_MIN_SCORE, help="порог совпадения"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    run(args.index, args.queries or QUERIES, args.repeat, args.min_score)
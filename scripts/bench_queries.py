@@ -0,0 +1,226 @@
+"""Замер SQL-запросов горячего пути через EXPLAIN (ANALYZE, BUFFERS).
+
+Выполняются те же построители запросов, что и в боте: прогресс за день
+(/check_progress), запись в лог и upsert итогов дня (_save_* в хендлерах),
+агрегация логов по дням (пересчёт daily_totals) и страница /history.
+Пользователи берутся из данных scripts.seed_data: самый активный, медианный
+и случайный. Пишущие запросы откатываются.
+
+Только для Postgres:
+    uv run -m scripts.bench_queries --repeat 10
+    uv run -m scripts.bench_queries --compare data/bench_queries_20260101T120000.json
+
+Результат сохраняется в JSON (по умолчанию data/bench_queries_<время>.json),
+--compare выводит изменение медианного времени относительно прошлого запуска.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import subprocess
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+
+from database import engine
+from models.models import User, WaterLog
+from scripts.seed_data import SEED_USER_BASE, SEED_USER_LIMIT
+from services.history import history_page_statement
+from services.progress import progress_statement
+from services.timezones import local_day
+from services.totals import aggregate_logs_statement, daily_totals_upsert
+
+logger = logging.getLogger("bench_queries")
+
+TABLES = ("users", "water_logs", "food_logs", "workout_logs", "daily_totals")
+
+
+def query_cases(telegram_id: int, tz: str) -> dict:
+    """Запрос → построитель SQLAlchemy, как его вызывает бот."""
+    now = datetime.now(timezone.utc)
+    today = local_day(tz, now)
+    return {
+        "progress": progress_statement(telegram_id, today),
+        "save_water_log": insert(WaterLog).values(
+            telegram_id=telegram_id, quantity=250, logged_at=now, local_day=today
+        ),
+        "save_daily_totals": daily_totals_upsert(telegram_id, water_ml=250, day=today),
+        "aggregate_today": aggregate_logs_statement(today, telegram_id),
+        "aggregate_week": aggregate_logs_statement(today - timedelta(days=6), telegram_id),
+        "history_page": history_page_statement(telegram_id, None, 11),
+    }
+
+
+async def pick_users(conn, seed: int) -> dict[str, tuple[int, str]]:
+    """Самый активный, медианный и случайный из сгенерированных пользователей:
+    профиль → (telegram_id, часовой пояс)."""
+    result = await conn.execute(
+        select(WaterLog.telegram_id, User.timezone)
+        .join(User, User.telegram_id == WaterLog.telegram_id)
+        .where(WaterLog.telegram_id.between(SEED_USER_BASE, SEED_USER_LIMIT - 1))
+        .group_by(WaterLog.telegram_id, User.timezone)
+        .order_by(func.count().desc())
+    )
+    ranked = [tuple(row) for row in result]
+    if not ranked:
+        raise SystemExit("❌ Нет данных — сначала запустите scripts.seed_data")
+    return {
+        "heavy": ranked[0],
+        "median": ranked[len(ranked) // 2],
+        "random": random.Random(seed).choice(ranked),
+    }
+
+
+async def explain(conn, stmt) -> dict:
+    """EXPLAIN ANALYZE ровно того SQL и тех параметров, что отправил бы бот."""
+    compiled = stmt.compile(dialect=conn.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    result = await conn.exec_driver_sql(
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {compiled}", params
+    )
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]
+
+
+def _summary(values: list[float]) -> dict:
+    return {
+        "median": round(statistics.median(values), 3),
+        "min": round(min(values), 3),
+        "max": round(max(values), 3),
+    }
+
+
+async def bench_case(conn, stmt, repeat: int) -> dict:
+    planning, execution = [], []
+    plan = None
+    for _ in range(repeat):
+        # Пишущие запросы тоже выполняются — откатываем каждый прогон
+        transaction = await conn.begin()
+        try:
+            plan = await explain(conn, stmt)
+        finally:
+            await transaction.rollback()
+        planning.append(plan["Planning Time"])
+        execution.append(plan["Execution Time"])
+    return {
+        "planning_ms": _summary(planning),
+        "execution_ms": _summary(execution),
+        "rows": plan["Plan"].get("Actual Rows"),
+        "plan": plan["Plan"],
+    }
+
+
+async def table_sizes(conn) -> dict[str, int]:
+    result = await conn.execute(
+        text(
+            "SELECT relname, reltuples::bigint FROM pg_class "
+            "WHERE relname = ANY(:tables) AND relkind IN ('r', 'p')"
+        ),
+        {"tables": list(TABLES)},
+    )
+    sizes = dict(result.all())
+    # У партиционированной таблицы reltuples = -1, считаем по партициям
+    for table in TABLES:
+        if sizes.get(table, -1) < 0:
+            total = await conn.execute(
+                text(
+                    "SELECT COALESCE(SUM(c.reltuples), 0)::bigint FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid "
+                    "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+                ),
+                {"table": table},
+            )
+            sizes[table] = total.scalar()
+    return sizes
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: dict, previous_path: str) -> None:
+    with open(previous_path, encoding="utf-8") as f:
+        previous = json.load(f)["queries"]
+    print(f"\nСравнение с {previous_path} (медиана execution, мс):")
+    for name, profiles in results.items():
+        for profile, current in profiles.items():
+            before = previous.get(name, {}).get(profile)
+            now_ms = current["execution_ms"]["median"]
+            if before is None:
+                print(f"  {name:<18}{profile:<8}{now_ms:>10}  (нет в прошлом запуске)")
+                continue
+            was_ms = before["execution_ms"]["median"]
+            change = (now_ms - was_ms) / was_ms * 100 if was_ms else 0.0
+            print(f"  {name:<18}{profile:<8}{was_ms:>10} → {now_ms:<10}{change:+.1f}%")
+
+
+async def run(args) -> None:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ Замер поддерживается только для Postgres")
+
+    results: dict[str, dict] = {}
+    async with engine.connect() as conn:
+        users = await pick_users(conn, args.seed)
+        sizes = await table_sizes(conn)
+        server_version = (await conn.execute(text("SHOW server_version"))).scalar()
+        await conn.rollback()
+
+        print(f"\n{'запрос':<18}{'профиль':<8}{'plan мс':>10}{'exec мс':>10}{'max мс':>10}{'строк':>8}")
+        for profile, (telegram_id, tz) in users.items():
+            for name, stmt in query_cases(telegram_id, tz).items():
+                case = await bench_case(conn, stmt, args.repeat)
+                results.setdefault(name, {})[profile] = case
+                print(
+                    f"{name:<18}{profile:<8}{case['planning_ms']['median']:>10}"
+                    f"{case['execution_ms']['median']:>10}"
+                    f"{case['execution_ms']['max']:>10}{case['rows'] or 0:>8}"
+                )
+    await engine.dispose()
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": git_revision(),
+        "server_version": server_version,
+        "repeat": args.repeat,
+        "users": users,
+        "table_rows": sizes,
+        "queries": results,
+    }
+    output = args.output or os.path.join(
+        "data", f"bench_queries_{datetime.now():%Y%m%dT%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+    logger.info(f"💾 Результат сохранён в {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="прогонов каждого запроса")
+    parser.add_argument("--seed", type=int, default=42, help="зерно выбора случайного пользователя")
+    parser.add_argument("--output", default=None, help="файл для результата (JSON)")
+    parser.add_argument("--compare", default=None, help="прошлый результат для сравнения")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
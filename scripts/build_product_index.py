@@ -0,0 +1,67 @@
+"""Сборка файла индекса названий продуктов для нечёткого поиска в /log_food.
+
+Источники: найденные ранее продукты (таблица products) и локальный каталог
+OpenFoodFacts (catalog_products). Бот подхватывает файл при старте.
+
+Запуск: uv run -m scripts.build_product_index [--output PATH] [--min-popularity N]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+
+from sqlalchemy import select
+
+from config import PRODUCT_INDEX_PATH
+from database import engine
+from models.models import CatalogProduct, Product
+from services.product_index import write_index
+
+logger = logging.getLogger("build_product_index")
+
+
+async def collect_entries(min_popularity: int) -> list[tuple[str, int]]:
+    entries = []
+    async with engine.connect() as conn:
+        result = await conn.stream(
+            select(Product.name, Product.calories_per_100g).where(
+                Product.name.is_not(None)
+            )
+        )
+        async for name, kcal in result:
+            entries.append((name, kcal))
+
+        # Популярные продукты первыми: при совпадении названий остаются они
+        result = await conn.stream(
+            select(CatalogProduct.name, CatalogProduct.calories_per_100g)
+            .where(CatalogProduct.popularity >= min_popularity)
+            .order_by(CatalogProduct.popularity.desc())
+        )
+        async for name, kcal in result:
+            entries.append((name, kcal))
+    return entries
+
+
+async def run(output: str, min_popularity: int) -> None:
+    entries = await collect_entries(min_popularity)
+    await engine.dispose()
+
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    size = write_index(output, entries)
+    logger.info(f"✅ Индекс записан в {output}: {len(entries)} названий, {size} байт")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--output", default=PRODUCT_INDEX_PATH)
+    parser.add_argument(
+        "--min-popularity",
+        type=int,
+        default=0,
+        help="брать из каталога только продукты с unique_scans_n не меньше N",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.output, args.min_popularity))
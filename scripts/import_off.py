@@ -0,0 +1,187 @@
+"""Импорт дампа OpenFoodFacts в локальный каталог catalog_products.
+
+Поддерживаются JSONL (openfoodfacts-products.jsonl[.gz]) и CSV с табуляцией
+(en.openfoodfacts.org.products.csv[.gz]). Файл читается потоково, в памяти
+держится только текущая пачка записей. Берутся продукты с названием и
+калорийностью (energy-kcal_100g или energy_100g).
+
+Повторный импорт инкрементальный: пропускаются записи, не изменявшиеся с
+последнего импорта (по last_modified_t), а существующие строки обновляются,
+только если запись в дампе новее.
+
+Запуск: uv run -m scripts.import_off <путь к дампу> [--full] [--batch-size N]
+"""
+
+import argparse
+import asyncio
+import csv
+import gzip
+import json
+import logging
+import sys
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from database import engine, init_models
+from models.models import CatalogProduct
+from services.products import normalize_query
+
+logger = logging.getLogger("import_off")
+
+# Всё, что выше — почти наверняка ошибка в данных
+MAX_KCAL_PER_100G = 950
+
+
+def _open(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "rt", encoding="utf-8", errors="replace")
+
+
+def _number(value) -> Optional[float]:
+    if value in (None, ""):
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    with _open(path) as f:
+        for line in f:
+            try:
+                product = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            nutriments = product.get("nutriments") or {}
+            yield {
+                "code": product.get("code") or product.get("_id"),
+                "product_name_ru": product.get("product_name_ru"),
+                "product_name": product.get("product_name"),
+                "energy_kcal": nutriments.get("energy-kcal_100g"),
+                "energy_kj": nutriments.get("energy_100g"),
+                "countries_tags": product.get("countries_tags") or [],
+                "unique_scans_n": product.get("unique_scans_n"),
+                "last_modified_t": product.get("last_modified_t"),
+            }
+
+
+def iter_csv(path: str) -> Iterator[dict]:
+    csv.field_size_limit(sys.maxsize)
+    with _open(path) as f:
+        for row in csv.DictReader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+            yield {
+                "code": row.get("code"),
+                "product_name_ru": row.get("product_name_ru"),
+                "product_name": row.get("product_name"),
+                "energy_kcal": row.get("energy-kcal_100g"),
+                "energy_kj": row.get("energy_100g"),
+                "countries_tags": (row.get("countries_tags") or "").split(","),
+                "unique_scans_n": row.get("unique_scans_n"),
+                "last_modified_t": row.get("last_modified_t"),
+            }
+
+
+def to_catalog_row(record: dict) -> Optional[dict]:
+    """Запись дампа → строка catalog_products или None, если не подходит."""
+    code = (record["code"] or "").strip()
+    name_ru = (record["product_name_ru"] or "").strip()
+    name = (record["product_name"] or "").strip()
+    if not code or not (name_ru or name):
+        return None
+
+    kcal = _number(record["energy_kcal"])
+    if kcal is None:
+        kj = _number(record["energy_kj"])
+        kcal = kj / 4.184 if kj is not None else None
+    if kcal is None or not (0 < kcal <= MAX_KCAL_PER_100G):
+        return None
+
+    names = dict.fromkeys(filter(None, (name_ru, name)))
+    return {
+        "code": code,
+        "name": name_ru or name,
+        "search_name": normalize_query(" ".join(names)),
+        "calories_per_100g": round(kcal),
+        "is_russian": "en:russia" in record["countries_tags"],
+        "popularity": int(_number(record["unique_scans_n"]) or 0),
+        "last_modified_t": int(_number(record["last_modified_t"]) or 0),
+    }
+
+
+async def _flush(batch: list[dict]) -> None:
+    stmt = insert(CatalogProduct)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CatalogProduct.code],
+        set_={
+            key: stmt.excluded[key]
+            for key in (
+                "name",
+                "search_name",
+                "calories_per_100g",
+                "is_russian",
+                "popularity",
+                "last_modified_t",
+            )
+        },
+        where=stmt.excluded.last_modified_t > CatalogProduct.last_modified_t,
+    )
+    async with engine.begin() as conn:
+        await conn.execute(stmt, batch)
+
+
+async def run(path: str, full: bool, batch_size: int) -> None:
+    await init_models()
+
+    since = 0
+    if not full:
+        async with engine.connect() as conn:
+            since = (
+                await conn.execute(select(func.max(CatalogProduct.last_modified_t)))
+            ).scalar() or 0
+        if since:
+            logger.info(f"🔁 Инкрементальный импорт: записи новее {since}")
+
+    records = iter_csv(path) if ".csv" in path else iter_jsonl(path)
+
+    seen = imported = 0
+    batch: dict[str, dict] = {}
+    for record in records:
+        seen += 1
+        row = to_catalog_row(record)
+        if row is None or row["last_modified_t"] < since:
+            continue
+        # В одной пачке код должен встречаться один раз (ON CONFLICT)
+        batch[row["code"]] = row
+        if len(batch) >= batch_size:
+            await _flush(list(batch.values()))
+            imported += len(batch)
+            batch.clear()
+            logger.info(f"📦 Прочитано {seen}, загружено {imported}")
+
+    if batch:
+        await _flush(list(batch.values()))
+        imported += len(batch)
+
+    await engine.dispose()
+    logger.info(f"✅ Готово: прочитано {seen}, загружено {imported}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("path", help="путь к дампу .jsonl[.gz] или .csv[.gz]")
+    parser.add_argument(
+        "--full",
+        action="store_true",
+        help="импортировать все записи, а не только изменённые",
+    )
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.path, args.full, args.batch_size))
@@ -0,0 +1,96 @@
+"""Перевод water_logs, food_logs и workout_logs на помесячное партиционирование.
+
+Для каждой ещё не партиционированной таблицы: старая таблица переименовывается
+в *_legacy, создаётся партиционированная таблица с партициями, покрывающими
+всю историю, данные переносятся, счётчик id продолжается с прежнего значения.
+Каждая таблица мигрирует в отдельной транзакции.
+
+Запуск: uv run -m scripts.migrate_partitions [--keep-legacy]
+"""
+
+import argparse
+import asyncio
+import logging
+
+from sqlalchemy import text
+
+from database import engine
+from models.models import Base
+from services.partitions import PARTITIONED_TABLES, ensure_partitions, is_partitioned
+
+logger = logging.getLogger("migrate_partitions")
+
+
+async def migrate_table(conn, table_name: str, keep_legacy: bool) -> None:
+    legacy = f"{table_name}_legacy"
+    table = Base.metadata.tables[table_name]
+    columns = ", ".join(column.name for column in table.columns)
+    source_columns = ", ".join(
+        "coalesce(logged_at, now())" if column.name == "logged_at" else column.name
+        for column in table.columns
+    )
+
+    # Имена последовательности и индексов глобальны в схеме — освобождаем их
+    # для новой таблицы.
+    await conn.execute(text(f"ALTER TABLE {table_name} RENAME TO {legacy}"))
+    await conn.execute(
+        text(f"ALTER SEQUENCE IF EXISTS {table_name}_id_seq RENAME TO {legacy}_id_seq")
+    )
+    await conn.execute(
+        text(f"ALTER INDEX IF EXISTS {table_name}_pkey RENAME TO {legacy}_pkey")
+    )
+
+    await conn.run_sync(table.create)
+
+    first_logged = (
+        await conn.execute(text(f"SELECT min(logged_at) FROM {legacy}"))
+    ).scalar()
+    await ensure_partitions(
+        conn,
+        start=first_logged.date() if first_logged else None,
+        retention_months=0,
+    )
+
+    result = await conn.execute(
+        text(
+            f"INSERT INTO {table_name} ({columns}) "
+            f"SELECT {source_columns} FROM {legacy}"
+        )
+    )
+    await conn.execute(
+        text(
+            f"SELECT setval(pg_get_serial_sequence('{table_name}', 'id'), "
+            f"coalesce((SELECT max(id) FROM {table_name}), 0) + 1, false)"
+        )
+    )
+    logger.info(f"📦 {table_name}: перенесено строк {result.rowcount}")
+
+    if not keep_legacy:
+        await conn.execute(text(f"DROP TABLE {legacy}"))
+
+
+async def run(keep_legacy: bool) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+
+    for table_name in PARTITIONED_TABLES:
+        async with engine.begin() as conn:
+            if await is_partitioned(conn, table_name):
+                logger.info(f"✅ {table_name} уже партиционирована")
+                continue
+            await migrate_table(conn, table_name, keep_legacy)
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--keep-legacy",
+        action="store_true",
+        help="не удалять исходные таблицы *_legacy после переноса",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.keep_legacy))
@@ -0,0 +1,39 @@
+"""Пересчёт таблицы daily_totals из сырых логов — одной транзакцией, запись
+в логи на это время ждёт. Недельные и месячные свёртки пересчитаются заново
+фоновой задачей бота.
+
+Запуск: uv run -m scripts.rebuild_totals [--since YYYY-MM-DD]
+"""
+
+import argparse
+import asyncio
+import logging
+from datetime import date
+
+from database import AsyncSessionLocal, engine, init_models
+from services.totals import rebuild_daily_totals
+
+logger = logging.getLogger("rebuild_totals")
+
+
+async def run(since: date | None) -> None:
+    await init_models()
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_daily_totals(session, since)
+        await session.commit()
+    await engine.dispose()
+    logger.info(f"✅ Пересчитано строк daily_totals: {rows}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--since",
+        type=date.fromisoformat,
+        default=None,
+        help="пересчитать только дни начиная с даты (по умолчанию — все)",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args.since))
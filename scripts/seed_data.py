@@ -0,0 +1,243 @@
+"""Генерация тестовых данных для замеров запросов: пользователи и их логи воды,
+еды и тренировок за последние --days дней.
+
+Активность распределена по Парето: немногие «тяжёлые» пользователи пишут
+в десятки раз чаще медианного, как в проде. Данные загружаются через COPY,
+после чего daily_totals пересчитывается из логов.
+
+Только для Postgres и только для локальной БД — скрипт удаляет и заново
+создаёт пользователей с id от SEED_USER_BASE:
+    uv run -m scripts.seed_data --users 10000 --days 90
+    uv run -m scripts.seed_data --users 100000 --days 180 --skew 1.2 --seed 7
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, text
+
+from database import AsyncSessionLocal, engine, init_models
+from handlers.profile import calculate_goals
+from models.models import Base
+from services.partitions import ensure_partitions
+from services.timezones import get_zone, local_day, timezone_for_city
+from services.totals import rebuild_daily_totals
+
+logger = logging.getLogger("seed_data")
+
+SEED_USER_BASE = 8_000_000_000
+# Пользователи bench_dispatcher начинаются с 9e9 — их не трогаем
+SEED_USER_LIMIT = 9_000_000_000
+
+CITIES = [
+    "Москва", "Санкт-Петербург", "Казань", "Калининград", "Екатеринбург",
+    "Новосибирск", "Иркутск", "Владивосток", "Сочи",
+]
+FOODS = [
+    ("банан", 120, 89),
+    ("яблоко", 180, 52),
+    ("гречка", 200, 110),
+    ("куриная грудка", 150, 165),
+    ("творог", 180, 121),
+    ("овсянка", 250, 88),
+    ("салат", 200, 45),
+    ("пицца", 300, 266),
+]
+WORKOUTS = [("бег", 10), ("йога", 3), ("плавание", 8), ("велосипед", 7), ("силовая", 6)]
+WATER_PORTIONS = [150, 200, 250, 300, 330, 500]
+
+# Доли записей по типам: вода пишется чаще всего, тренировки — реже
+LOG_TABLES = ["water_logs", "food_logs", "workout_logs"]
+LOG_SHARES = [0.5, 0.38, 0.12]
+
+LOG_COLUMNS = {
+    "water_logs": ["telegram_id", "quantity", "logged_at", "local_day"],
+    "food_logs": ["telegram_id", "name", "weight", "calories", "logged_at", "local_day"],
+    "workout_logs": [
+        "telegram_id", "kind", "duration", "calories_burned", "logged_at", "local_day",
+    ],
+}
+USER_COLUMNS = [
+    "telegram_id", "weight", "height", "age", "city", "timezone", "gender",
+    "activity_minutes", "calorie_goal", "water_goal", "created_at",
+]
+
+
+def make_user(rng: random.Random, telegram_id: int, created_at: datetime) -> tuple:
+    gender = rng.choice(["мужчина", "женщина"])
+    weight = int(rng.gauss(80 if gender == "мужчина" else 65, 12))
+    height = int(rng.gauss(178 if gender == "мужчина" else 165, 8))
+    age = rng.randint(16, 70)
+    activity = rng.choice([0, 15, 30, 45, 60, 90, 120])
+    calorie_goal, water_goal, *_ = calculate_goals(weight, height, age, activity)
+    city = rng.choice(CITIES)
+    return (
+        telegram_id, weight, height, age, city, timezone_for_city(city), gender,
+        activity, calorie_goal, water_goal, created_at,
+    )
+
+
+def make_entry(
+    rng: random.Random, table: str, telegram_id: int, logged_at: datetime, tz: str
+):
+    day = local_day(tz, logged_at)
+    if table == "water_logs":
+        return telegram_id, rng.choice(WATER_PORTIONS), logged_at, day
+    if table == "food_logs":
+        name, weight, per_100g = rng.choice(FOODS)
+        weight = max(20, int(rng.gauss(weight, weight / 4)))
+        return telegram_id, name, weight, weight * per_100g // 100, logged_at, day
+    kind, per_minute = rng.choice(WORKOUTS)
+    duration = rng.choice([20, 30, 45, 60, 90])
+    return telegram_id, kind, duration, duration * per_minute, logged_at, day
+
+
+class Seeder:
+    """Генерирует записи пользователей и пишет их через COPY пачками."""
+
+    def __init__(self, connection, args):
+        self.connection = connection  # соединение asyncpg
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.now = datetime.now(timezone.utc)
+        self.buffers: dict[str, list[tuple]] = {table: [] for table in LOG_COLUMNS}
+        self.counts = dict.fromkeys(LOG_COLUMNS, 0)
+        # Среднее распределения Парето — чтобы среднее число записей в день
+        # совпадало с --mean-entries при любой асимметрии
+        self.pareto_mean = args.skew / (args.skew - 1)
+
+    async def _flush(self, table: str) -> None:
+        records = self.buffers[table]
+        if not records:
+            return
+        await self.connection.copy_records_to_table(
+            table, records=records, columns=LOG_COLUMNS[table]
+        )
+        self.counts[table] += len(records)
+        self.buffers[table] = []
+
+    async def _add(self, table: str, record: tuple) -> None:
+        self.buffers[table].append(record)
+        if len(self.buffers[table]) >= self.args.batch_size:
+            await self._flush(table)
+
+    def _entries_per_day(self) -> float:
+        weight = self.rng.paretovariate(self.args.skew) / self.pareto_mean
+        # Без ограничения один пользователь с хвоста распределения
+        # даёт больше записей, чем все остальные вместе
+        return min(self.args.mean_entries * weight, self.args.max_entries)
+
+    async def _seed_user_logs(
+        self, telegram_id: int, tz: str, first_day: datetime
+    ) -> None:
+        rate = self._entries_per_day()
+        # Лёгкие пользователи пишут не каждый день
+        active_share = min(1.0, 0.2 + rate / self.args.mean_entries / 2)
+        for offset in range(self.args.days):
+            if self.rng.random() > active_share:
+                continue
+            count = int(rate) + (self.rng.random() < rate - int(rate))
+            day = first_day + timedelta(days=offset)
+            for _ in range(count):
+                table = self.rng.choices(LOG_TABLES, weights=LOG_SHARES)[0]
+                # Записи с 7 до 23 часов по местному времени
+                local = day + timedelta(seconds=self.rng.randint(7 * 3600, 23 * 3600))
+                logged_at = local.replace(tzinfo=get_zone(tz)).astimezone(timezone.utc)
+                if logged_at > self.now:
+                    continue
+                await self._add(
+                    table, make_entry(self.rng, table, telegram_id, logged_at, tz)
+                )
+
+    async def run(self, first_day: datetime) -> None:
+        users = [
+            make_user(self.rng, SEED_USER_BASE + i, first_day)
+            for i in range(self.args.users)
+        ]
+        await self.connection.copy_records_to_table(
+            "users", records=users, columns=USER_COLUMNS
+        )
+        for i, user in enumerate(users, 1):
+            await self._seed_user_logs(user[0], user[5], first_day)
+            if i % 1000 == 0:
+                logger.info(f"⏳ Пользователей: {i}/{self.args.users}, записей: {self.counts}")
+        for table in LOG_COLUMNS:
+            await self._flush(table)
+
+
+async def reset_seed_users(conn) -> None:
+    for table in reversed(Base.metadata.sorted_tables):
+        if "telegram_id" in table.c:
+            await conn.execute(
+                delete(table).where(
+                    table.c.telegram_id.between(SEED_USER_BASE, SEED_USER_LIMIT - 1)
+                )
+            )
+
+
+async def run(args) -> None:
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("❌ Генерация данных поддерживается только для Postgres")
+
+    await init_models()
+    today = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = today - timedelta(days=args.days - 1)
+
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await reset_seed_users(conn)
+        # Партиции за весь период генерации (по умолчанию есть только с текущего
+        # месяца); утро первого дня на востоке — ещё предыдущие сутки по UTC
+        await ensure_partitions(
+            conn, start=(first_day - timedelta(days=1)).date(), retention_months=0
+        )
+        raw = await conn.get_raw_connection()
+        seeder = Seeder(raw.driver_connection, args)
+        await seeder.run(first_day)
+    logger.info(
+        f"📥 Загружено за {time.perf_counter() - started:.1f} с: "
+        f"пользователей {args.users}, записей {seeder.counts}"
+    )
+
+    async with AsyncSessionLocal() as session:
+        rows = await rebuild_daily_totals(session, first_day.date())
+        await session.commit()
+    logger.info(f"✅ Пересчитано строк daily_totals: {rows}")
+
+    # Свежая статистика, иначе планировщик строит планы по пустым таблицам
+    async with engine.begin() as conn:
+        for table in ("users", *LOG_COLUMNS, "daily_totals"):
+            await conn.execute(text(f"ANALYZE {table}"))
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--users", type=int, default=10_000, help="число пользователей")
+    parser.add_argument("--days", type=int, default=90, help="за сколько последних дней")
+    parser.add_argument(
+        "--mean-entries", type=float, default=4, help="среднее число записей в день"
+    )
+    parser.add_argument(
+        "--max-entries", type=float, default=60, help="предел записей в день на пользователя"
+    )
+    parser.add_argument(
+        "--skew",
+        type=float,
+        default=1.5,
+        help="параметр Парето (> 1): чем меньше, тем сильнее перекос к тяжёлым",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="зерно генератора")
+    parser.add_argument("--batch-size", type=int, default=50_000, help="строк в одном COPY")
+    args = parser.parse_args()
+    if args.skew <= 1:
+        parser.error("--skew должен быть больше 1")
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run(args))
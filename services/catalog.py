@@ -0,0 +1,43 @@
+import logging
+from typing import Optional
+
+from sqlalchemy import case, func, literal, or_, select
+
+from database import AsyncSessionLocal
+from models.models import CatalogProduct
+
+logger = logging.getLogger("catalog")
+
+
+def catalog_search_statement(query: str, limit: int = 1):
+    """Поиск по триграммному индексу: сначала точные вхождения, затем похожие
+    по словам, при равенстве — российские и популярные продукты."""
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    contains = CatalogProduct.search_name.ilike(pattern)
+    similar = literal(query).op("<%")(CatalogProduct.search_name)
+    return (
+        select(CatalogProduct.name, CatalogProduct.calories_per_100g)
+        .where(or_(contains, similar))
+        .order_by(
+            case((contains, 0), else_=1),
+            func.word_similarity(query, CatalogProduct.search_name).desc(),
+            CatalogProduct.is_russian.desc(),
+            CatalogProduct.popularity.desc(),
+        )
+        .limit(limit)
+    )
+
+
+async def search_catalog(query: str) -> Optional[dict]:
+    """Ищет продукт в локальном каталоге по нормализованному запросу."""
+    try:
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(catalog_search_statement(query))
+            row = result.first()
+    except Exception as e:
+        logger.warning(f"⚠️ Поиск по локальному каталогу недоступен: {e}")
+        return None
+
+    if row is None:
+        return None
+    return {"name": row.name, "calories_per_100g": row.calories_per_100g}
@@ -0,0 +1,49 @@
+"""Отрисовка графиков в отдельном процессе.
+
+Модуль намеренно не импортирует ничего из бота: он загружается в процессах
+пула, а matplotlib импортируется только при первой отрисовке.
+"""
+
+import io
+from datetime import date
+
+
+def render_progress_chart(
+    days: list[date],
+    water: list[int],
+    eaten: list[int],
+    burned: list[int],
+    water_goal: int,
+    calorie_goal: int,
+) -> bytes:
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    labels = [day.strftime("%d.%m") for day in days]
+    x = range(len(days))
+
+    fig, (ax_water, ax_food) = plt.subplots(2, 1, figsize=(8, 6), sharex=True)
+
+    ax_water.bar(x, water, color="#4a90d9", label="Выпито, мл")
+    ax_water.axhline(water_goal, color="#1f4e79", linestyle="--", label="Норма")
+    ax_water.set_title("Вода")
+    ax_water.legend(loc="upper left")
+
+    # Норма калорий растёт на сожжённые на тренировках
+    goals = [calorie_goal + spent for spent in burned]
+    ax_food.bar(x, eaten, color="#e8833a", label="Потреблено, ккал")
+    ax_food.plot(x, goals, color="#8b3a0f", linestyle="--", label="Норма + сожжено")
+    ax_food.set_title("Калории")
+    ax_food.legend(loc="upper left")
+
+    step = max(1, len(days) // 10)
+    ax_food.set_xticks(list(x)[::step])
+    ax_food.set_xticklabels(labels[::step])
+
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=100)
+    plt.close(fig)
+    return buffer.getvalue()
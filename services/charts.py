@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from typing import Optional
+
+from cachetools import LRUCache
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import CHART_CACHE_SIZE, CHART_WORKERS
+from models.models import DailyTotal
+from services.chart_render import render_progress_chart
+from services.progress import ProgressSnapshot
+
+_executor: Optional[ProcessPoolExecutor] = None
+
+# (telegram_id, дней) → (данные графика, file_id загруженной картинки).
+# Данные включают сегодняшние итоги, поэтому новая запись за день
+# приводит к перерисовке, а повторные запросы — нет.
+_chart_cache = LRUCache(maxsize=CHART_CACHE_SIZE)
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: дочерние процессы не наследуют потоки и соединения бота.
+        # Они заново импортируют только главный модуль — тонкий main.py.
+        _executor = ProcessPoolExecutor(
+            max_workers=CHART_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def shutdown_chart_workers() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def chart_cache_key(snapshot: ProgressSnapshot, days: int) -> tuple:
+    return (snapshot.day, days, *snapshot[1:])
+
+
+def get_cached_chart(telegram_id: int, days: int, key: tuple) -> Optional[str]:
+    cached = _chart_cache.get((telegram_id, days))
+    if cached is not None and cached[0] == key:
+        return cached[1]
+    return None
+
+
+def remember_chart(telegram_id: int, days: int, key: tuple, file_id: str) -> None:
+    _chart_cache[(telegram_id, days)] = (key, file_id)
+
+
+async def load_chart_series(
+    session: AsyncSession, telegram_id: int, snapshot: ProgressSnapshot, days: int
+) -> tuple:
+    """Ряды за days дней (сегодня — из снимка): аргументы render_chart."""
+    first_day = snapshot.day - timedelta(days=days - 1)
+    result = await session.execute(
+        select(
+            DailyTotal.day,
+            DailyTotal.water_ml,
+            DailyTotal.calories_eaten,
+            DailyTotal.calories_burned,
+        )
+        .where(DailyTotal.telegram_id == telegram_id)
+        .where(DailyTotal.day >= first_day)
+        .where(DailyTotal.day < snapshot.day)
+    )
+    by_day = {row.day: row[1:] for row in result}
+    by_day[snapshot.day] = (
+        snapshot.water_ml,
+        snapshot.calories_eaten,
+        snapshot.calories_burned,
+    )
+
+    series_days = [first_day + timedelta(days=i) for i in range(days)]
+    values = [by_day.get(day, (0, 0, 0)) for day in series_days]
+    return (
+        series_days,
+        [water for water, _, _ in values],
+        [eaten for _, eaten, _ in values],
+        [burned for _, _, burned in values],
+        snapshot.water_goal,
+        snapshot.calorie_goal,
+    )
+
+
+async def render_chart(series: tuple) -> bytes:
+    """Рисует PNG в пуле процессов; series — из load_chart_series.
+
+    Сессию БД к этому моменту стоит закрыть: отрисовка может ждать
+    свободный процесс пула.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), render_progress_chart, *series)
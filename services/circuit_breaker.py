@@ -0,0 +1,74 @@
+import logging
+import time
+
+logger = logging.getLogger("circuit_breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Автомат защиты внешнего сервиса.
+
+    После failure_threshold ошибок подряд размыкается и сразу отклоняет запросы.
+    Через reset_timeout пропускает один пробный запрос: успех замыкает цепь,
+    ошибка снова размыкает.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+            self._set_state(HALF_OPEN)
+        if self.state == HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        self.rejected += 1
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != CLOSED:
+            self._set_state(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+            if self.state != OPEN:
+                self._set_state(OPEN)
+
+    def release(self) -> None:
+        """Пробный запрос отменён без результата — разрешить следующий."""
+        self._probe_in_flight = False
+
+    def snapshot(self) -> dict:
+        """Состояние для мониторинга."""
+        return {
+            "name": self.name,
+            "state": self.state,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "open_for": (
+                round(time.monotonic() - self.opened_at, 1)
+                if self.state != CLOSED
+                else 0
+            ),
+        }
+
+    def _set_state(self, state: str) -> None:
+        logger.warning(f"⚡ {self.name}: {self.state} → {state}")
+        self.state = state
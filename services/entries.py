@@ -0,0 +1,91 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import after_commit, commit_session, mark_written
+from services.journal import LOG_MODELS, entry_totals, journal
+from services.progress import (
+    add_to_progress,
+    broadcast_progress_invalidation,
+    remember_totals,
+)
+from services.timezones import local_day
+from services.totals import DayTotals, add_to_daily_totals
+
+
+async def _save(
+    session: AsyncSession, user, rows: dict[str, list[dict]]
+) -> DayTotals:
+    """Сохраняет строки логов одного действия и возвращает итоги дня.
+
+    В режиме отложенной записи строки уходят в журнал, иначе — в транзакцию
+    session вместе с обновлением daily_totals, и она сразу коммитится:
+    «Записано» пользователь увидит только для сохранённых данных, а блокировка
+    строки daily_totals и соединение не держатся, пока уходит ответ.
+    """
+    telegram_id = user.telegram_id
+    logged_at = datetime.now(timezone.utc)
+    day = local_day(user.timezone, logged_at)
+
+    if journal.enabled:
+        entry = await journal.append(telegram_id, rows, logged_at, day)
+        snapshot = await add_to_progress(user, entry_totals(entry), day, session)
+        return DayTotals(
+            snapshot.water_ml, snapshot.calories_eaten, snapshot.calories_burned
+        )
+
+    for table, table_rows in rows.items():
+        for row in table_rows:
+            session.add(
+                LOG_MODELS[table](
+                    telegram_id=telegram_id,
+                    logged_at=logged_at,
+                    local_day=day,
+                    **row,
+                )
+            )
+
+    totals = await add_to_daily_totals(
+        session, telegram_id, day=day, **entry_totals({"rows": rows})._asdict()
+    )
+
+    after_commit(session, lambda: mark_written(telegram_id))
+    after_commit(session, lambda: remember_totals(telegram_id, user, totals, day))
+    # Снимки прогресса этого пользователя в других воркерах устарели
+    after_commit(session, lambda: broadcast_progress_invalidation([telegram_id]))
+    await commit_session(session)
+    return totals
+
+
+async def save_water(session: AsyncSession, user, quantity: int) -> DayTotals:
+    return await _save(session, user, {"water_logs": [{"quantity": quantity}]})
+
+
+async def save_food(
+    session: AsyncSession, user, name: str, weight: int, calories: int
+) -> DayTotals:
+    return await _save(
+        session,
+        user,
+        {"food_logs": [{"name": name, "weight": weight, "calories": calories}]},
+    )
+
+
+async def save_workout(
+    session: AsyncSession,
+    user,
+    kind: str,
+    duration: int,
+    calories_burned: int,
+    water_ml: int,
+) -> DayTotals:
+    return await _save(
+        session,
+        user,
+        {
+            "workout_logs": [
+                {"kind": kind, "duration": duration, "calories_burned": calories_burned}
+            ],
+            "water_logs": [{"quantity": water_ml}],
+        },
+    )
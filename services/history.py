@@ -0,0 +1,110 @@
+from datetime import datetime
+from typing import AsyncIterator, NamedTuple, Optional
+
+from sqlalchemy import literal, null, select, tuple_, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import FoodLog, WaterLog, WorkoutLog
+
+# Порядок источников при совпадении logged_at и id
+WATER, FOOD, WORKOUT = 0, 1, 2
+
+
+class HistoryCursor(NamedTuple):
+    logged_at: datetime
+    source: int
+    id: int
+
+
+class HistoryEntry(NamedTuple):
+    source: int
+    id: int
+    logged_at: datetime
+    name: Optional[str]
+    quantity: int
+    calories: Optional[int]
+
+    @property
+    def cursor(self) -> HistoryCursor:
+        return HistoryCursor(self.logged_at, self.source, self.id)
+
+
+def _branches(telegram_id: int, before: Optional[datetime]):
+    branches = [
+        select(
+            literal(WATER).label("source"),
+            WaterLog.id,
+            WaterLog.logged_at,
+            null().label("name"),
+            WaterLog.quantity.label("quantity"),
+            null().label("calories"),
+        ).where(WaterLog.telegram_id == telegram_id),
+        select(
+            literal(FOOD).label("source"),
+            FoodLog.id,
+            FoodLog.logged_at,
+            FoodLog.name,
+            FoodLog.weight.label("quantity"),
+            FoodLog.calories.label("calories"),
+        ).where(FoodLog.telegram_id == telegram_id),
+        select(
+            literal(WORKOUT).label("source"),
+            WorkoutLog.id,
+            WorkoutLog.logged_at,
+            WorkoutLog.kind.label("name"),
+            WorkoutLog.duration.label("quantity"),
+            WorkoutLog.calories_burned.label("calories"),
+        ).where(WorkoutLog.telegram_id == telegram_id),
+    ]
+    if before is not None:
+        # Фильтр по logged_at в каждой ветке, чтобы работал индекс
+        # (telegram_id, logged_at) и отсекались лишние партиции.
+        for i, model in enumerate((WaterLog, FoodLog, WorkoutLog)):
+            branches[i] = branches[i].where(model.logged_at <= before)
+    return branches
+
+
+def history_page_statement(
+    telegram_id: int, after: Optional[HistoryCursor], limit: int
+):
+    """Страница истории от новых к старым, начиная сразу после курсора."""
+    logs = union_all(
+        *_branches(telegram_id, after.logged_at if after else None)
+    ).subquery()
+    stmt = select(logs)
+    if after is not None:
+        stmt = stmt.where(
+            tuple_(logs.c.logged_at, logs.c.source, logs.c.id) < tuple_(*after)
+        )
+    return stmt.order_by(
+        logs.c.logged_at.desc(), logs.c.source.desc(), logs.c.id.desc()
+    ).limit(limit)
+
+
+async def get_history_page(
+    session: AsyncSession,
+    telegram_id: int,
+    after: Optional[HistoryCursor] = None,
+    limit: int = 10,
+) -> tuple[list[HistoryEntry], Optional[HistoryCursor]]:
+    """Возвращает записи страницы и курсор следующей страницы (или None)."""
+    result = await session.execute(
+        history_page_statement(telegram_id, after, limit + 1)
+    )
+    entries = [HistoryEntry(*row) for row in result]
+    next_cursor = entries[limit - 1].cursor if len(entries) > limit else None
+    return entries[:limit], next_cursor
+
+
+async def stream_history(
+    session: AsyncSession, telegram_id: int, batch_size: int = 1000
+) -> AsyncIterator[list[HistoryEntry]]:
+    """Вся история от старых к новым пачками через серверный курсор."""
+    logs = union_all(*_branches(telegram_id, None)).subquery()
+    result = await session.stream(
+        select(logs)
+        .order_by(logs.c.logged_at, logs.c.source, logs.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for partition in result.partitions(batch_size):
+        yield [HistoryEntry(*row) for row in partition]
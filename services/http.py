@@ -0,0 +1,94 @@
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, NamedTuple
+
+import aiohttp
+
+from config import (
+    HTTP_DNS_CACHE_TTL,
+    HTTP_KEEPALIVE_TIMEOUT,
+    HTTP_POOL_SIZE,
+    HTTP_POOL_SIZE_PER_HOST,
+    OPENFOODFACTS_CONCURRENCY,
+    OPENFOODFACTS_TIMEOUT,
+    OPENWEATHER_CONCURRENCY,
+    OPENWEATHER_TIMEOUT,
+)
+from services.metrics import http_latency, http_responses
+
+logger = logging.getLogger("http_client")
+
+
+class ServiceLimits(NamedTuple):
+    timeout: float
+    concurrency: int
+
+
+SERVICES = {
+    "openweather": ServiceLimits(OPENWEATHER_TIMEOUT, OPENWEATHER_CONCURRENCY),
+    "openfoodfacts": ServiceLimits(OPENFOODFACTS_TIMEOUT, OPENFOODFACTS_CONCURRENCY),
+}
+
+
+class HttpClient:
+    """Одна ClientSession на всё приложение: пул keep-alive соединений по хостам,
+    кэш DNS, а для каждого внешнего сервиса — свой таймаут и лимит параллельных
+    запросов."""
+
+    def __init__(self):
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphores = {
+            name: asyncio.Semaphore(limits.concurrency)
+            for name, limits in SERVICES.items()
+        }
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=HTTP_POOL_SIZE,
+                limit_per_host=HTTP_POOL_SIZE_PER_HOST,
+                ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+                keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={"User-Agent": "DailyDoseBot/0.1"},
+            )
+        return self._session
+
+    async def start(self) -> None:
+        _ = self.session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    @asynccontextmanager
+    async def get(
+        self, service: str, url: str, **kwargs
+    ) -> AsyncIterator[aiohttp.ClientResponse]:
+        """GET к сервису с его таймаутом; ответ нужно прочитать внутри блока."""
+        limits = SERVICES[service]
+        async with self._semaphores[service]:
+            started = time.perf_counter()
+            status = "error"
+            try:
+                async with self.session.get(
+                    url, timeout=aiohttp.ClientTimeout(total=limits.timeout), **kwargs
+                ) as response:
+                    status = response.status
+                    yield response
+            except asyncio.TimeoutError:
+                status = "timeout"
+                raise
+            finally:
+                # Время — вместе с чтением ответа внутри блока
+                http_latency.observe(time.perf_counter() - started, service)
+                http_responses.inc(service, status)
+
+
+http_client = HttpClient()
@@ -0,0 +1,366 @@
+import asyncio
+import glob
+import json
+import logging
+import os
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import delete, insert
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from config import (
+    JOURNAL_DIR,
+    JOURNAL_FLUSH_INTERVAL,
+    JOURNAL_FLUSH_SIZE,
+    JOURNAL_FSYNC,
+    JOURNAL_MAX_ATTEMPTS,
+    JOURNAL_SEGMENT_RETENTION_DAYS,
+    WRITE_BEHIND_ENABLED,
+)
+from database import AsyncSessionLocal, mark_written
+from models.models import FoodLog, JournalSegment, WaterLog, WorkoutLog
+from services.totals import DayTotals, add_many_to_daily_totals
+
+logger = logging.getLogger("journal")
+
+LOG_MODELS = {
+    "water_logs": WaterLog,
+    "food_logs": FoodLog,
+    "workout_logs": WorkoutLog,
+}
+
+# Какая колонка какой таблицы входит в итоги дня
+TOTAL_COLUMNS = {
+    "water_logs": ("quantity", 0),
+    "food_logs": ("calories", 1),
+    "workout_logs": ("calories_burned", 2),
+}
+
+# Ошибки связи с БД: сегмент не виноват, попытку не считаем
+_CONNECTION_ERRORS = (OperationalError, InterfaceError, OSError, asyncio.TimeoutError)
+
+# Как часто удалять старые отметки journal_segments, секунд
+_PRUNE_INTERVAL = 3600
+
+
+def entry_totals(entry: dict) -> DayTotals:
+    values = [0, 0, 0]
+    for table, rows in entry["rows"].items():
+        column, position = TOTAL_COLUMNS[table]
+        values[position] += sum(row[column] for row in rows)
+    return DayTotals(*values)
+
+
+def _entry_day(entry: dict) -> date:
+    if "local_day" in entry:
+        return date.fromisoformat(entry["local_day"])
+    # Сегменты, записанные до появления local_day
+    return datetime.fromisoformat(entry["logged_at"]).astimezone(timezone.utc).date()
+
+
+class WriteBehindJournal:
+    """Журнал отложенной записи логов.
+
+    Запись дописывается строкой JSON в активный сегмент на диске, после чего
+    пользователю уже можно отвечать. С fsync запись ждёт группового fsync:
+    один вызов в отдельном потоке на все записи, дописанные к его началу.
+    Фоновая задача по размеру или таймеру закрывает сегмент и переносит его
+    в БД одной транзакцией: пакетные INSERT в логи, пакетный upsert
+    в daily_totals и отметка в journal_segments.
+    Сегменты, не перенесённые до остановки процесса, переносятся при старте.
+    Сегмент, который не удалось перенести max_attempts раз, уходит в failed/.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        flush_size: int,
+        flush_interval: float,
+        fsync: bool,
+        enabled: bool,
+        max_attempts: int = JOURNAL_MAX_ATTEMPTS,
+        retention_days: int = JOURNAL_SEGMENT_RETENTION_DAYS,
+    ):
+        self.directory = directory
+        self.failed_directory = os.path.join(directory, "failed")
+        self.max_attempts = max_attempts
+        self.retention_days = retention_days
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.enabled = enabled
+        self._file = None
+        self._segment_path = None
+        self._entries: list[dict] = []
+        self._closed_segments: list[tuple[str, list[dict]]] = []
+        self._pending: dict[tuple[int, date], DayTotals] = defaultdict(DayTotals)
+        self._attempts: dict[str, int] = {}
+        self._pruned_at = 0.0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self._flush_lock = asyncio.Lock()
+        self._sync_waiters: list[asyncio.Future] = []
+        self._sync_task: asyncio.Task | None = None
+
+    # --- запись ---
+
+    async def append(
+        self,
+        telegram_id: int,
+        rows: dict[str, list[dict]],
+        logged_at: datetime,
+        day: date,
+    ) -> dict:
+        """Дописывает в журнал строки логов одного действия пользователя;
+        day — дата logged_at в поясе пользователя."""
+        entry = {
+            "telegram_id": telegram_id,
+            "logged_at": logged_at.isoformat(),
+            "local_day": day.isoformat(),
+            "rows": rows,
+        }
+        if self._file is None:
+            self._open_segment()
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+        self._entries.append(entry)
+        self._add_pending(entry, 1)
+        if len(self._entries) >= self.flush_size:
+            self._wakeup.set()
+        if self.fsync:
+            await self._sync()
+        return entry
+
+    async def _sync(self) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self._sync_waiters.append(future)
+        if self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_rounds())
+        # Отмена одного ожидающего не должна прерывать общий fsync
+        await asyncio.shield(future)
+
+    async def _sync_rounds(self) -> None:
+        """Групповой fsync: пока есть ожидающие, один вызов os.fsync в потоке
+        на всех, кто дописал запись до начала раунда."""
+        try:
+            while self._sync_waiters:
+                waiters, self._sync_waiters = self._sync_waiters, []
+                try:
+                    await asyncio.to_thread(os.fsync, self._file.fileno())
+                except Exception as e:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_exception(e)
+                else:
+                    for waiter in waiters:
+                        if not waiter.done():
+                            waiter.set_result(None)
+        finally:
+            self._sync_task = None
+
+    async def _wait_synced(self) -> None:
+        # Сегмент закрываем только после fsync всех его записей
+        while self._sync_task is not None:
+            await asyncio.shield(self._sync_task)
+
+    def pending_totals(self, telegram_id: int, day: date) -> DayTotals:
+        """Итоги дня из ещё не перенесённых в БД записей."""
+        return self._pending.get((telegram_id, day), DayTotals())
+
+    def _add_pending(self, entry: dict, sign: int) -> None:
+        key = (entry["telegram_id"], _entry_day(entry))
+        delta = entry_totals(entry)
+        current = self._pending[key]
+        updated = DayTotals(*(a + sign * b for a, b in zip(current, delta)))
+        if any(updated):
+            self._pending[key] = updated
+        else:
+            self._pending.pop(key, None)
+
+    def _open_segment(self) -> None:
+        name = f"{time.time_ns()}-{os.getpid()}.jsonl"
+        self._segment_path = os.path.join(self.directory, name)
+        self._file = open(self._segment_path, "a", encoding="utf-8")
+
+    def _close_segment(self) -> None:
+        if self._file is None:
+            return
+        self._file.close()
+        self._closed_segments.append((self._segment_path, self._entries))
+        self._file = None
+        self._segment_path = None
+        self._entries = []
+
+    # --- перенос в БД ---
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            if self._entries:
+                await self._wait_synced()
+                self._close_segment()
+            while self._closed_segments:
+                path, entries = self._closed_segments[0]
+                try:
+                    await self._write_segment(path, entries)
+                except _CONNECTION_ERRORS:
+                    raise
+                except Exception as e:
+                    attempts = self._attempts.get(path, 0) + 1
+                    if attempts < self.max_attempts:
+                        self._attempts[path] = attempts
+                        raise
+                    self._quarantine(path, e)
+                self._attempts.pop(path, None)
+                self._closed_segments.pop(0)
+                for entry in entries:
+                    self._add_pending(entry, -1)
+
+    def _quarantine(self, path: str, error: Exception) -> None:
+        """Убирает сегмент с ошибкой в данных (например, FK на удалённого
+        пользователя) в failed/, чтобы следующие сегменты переносились.
+        Чтобы повторить перенос, файл возвращают в JOURNAL_DIR до старта."""
+        os.makedirs(self.failed_directory, exist_ok=True)
+        os.replace(path, os.path.join(self.failed_directory, os.path.basename(path)))
+        logger.error(
+            f"🚫 Сегмент {os.path.basename(path)} не перенесён после "
+            f"{self.max_attempts} попыток, перемещён в {self.failed_directory}: {error}"
+        )
+
+    async def prune_segments(self) -> None:
+        """Удаляет отметки journal_segments старше retention_days."""
+        if self.retention_days <= 0:
+            return
+        cutoff = datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(JournalSegment).where(JournalSegment.flushed_at < cutoff)
+            )
+            await session.commit()
+        if result.rowcount:
+            logger.info(f"🧹 Удалено старых отметок сегментов: {result.rowcount}")
+
+    async def _write_segment(self, path: str, entries: list[dict]) -> None:
+        segment_id = os.path.basename(path)
+        rows_by_table: dict[str, list[dict]] = defaultdict(list)
+        deltas: dict[tuple[int, date], DayTotals] = defaultdict(DayTotals)
+
+        for entry in entries:
+            logged_at = datetime.fromisoformat(entry["logged_at"])
+            day = _entry_day(entry)
+            for table, rows in entry["rows"].items():
+                for row in rows:
+                    rows_by_table[table].append(
+                        {
+                            **row,
+                            "telegram_id": entry["telegram_id"],
+                            "logged_at": logged_at,
+                            "local_day": day,
+                        }
+                    )
+            key = (entry["telegram_id"], day)
+            deltas[key] = DayTotals(
+                *(a + b for a, b in zip(deltas[key], entry_totals(entry)))
+            )
+
+        async with AsyncSessionLocal() as session:
+            already = await session.get(JournalSegment, segment_id)
+            if already is None:
+                for table, rows in rows_by_table.items():
+                    await session.execute(insert(LOG_MODELS[table]), rows)
+                await add_many_to_daily_totals(
+                    session,
+                    [
+                        {"telegram_id": telegram_id, "day": day, **totals._asdict()}
+                        for (telegram_id, day), totals in deltas.items()
+                    ],
+                )
+                session.add(JournalSegment(segment_id=segment_id))
+                await session.commit()
+                for telegram_id, _ in deltas:
+                    mark_written(telegram_id)
+                # services.progress сам импортирует журнал
+                from services.progress import broadcast_progress_invalidation
+
+                await broadcast_progress_invalidation(
+                    telegram_id for telegram_id, _ in deltas
+                )
+                logger.info(f"💾 Сегмент {segment_id}: перенесено записей {len(entries)}")
+            else:
+                logger.info(f"↩️ Сегмент {segment_id} уже был перенесён")
+
+        os.remove(path)
+
+    async def replay(self) -> None:
+        """Переносит в БД сегменты, оставшиеся от прошлого запуска."""
+        for path in sorted(glob.glob(os.path.join(self.directory, "*.jsonl"))):
+            entries = []
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entries.append(json.loads(line))
+                    except json.JSONDecodeError:
+                        # Оборванная последняя строка: запись не была подтверждена
+                        logger.warning(f"⚠️ Повреждённая строка в {path}")
+            self._closed_segments.append((path, entries))
+            for entry in entries:
+                self._add_pending(entry, 1)
+        if self._closed_segments:
+            logger.info(f"🔁 Найдено сегментов журнала: {len(self._closed_segments)}")
+        await self.flush()
+
+    # --- жизненный цикл ---
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                # Сегмент остаётся на диске и в очереди — повторим на следующем тике
+                logger.error(f"❌ Не удалось перенести журнал в БД: {e}")
+            if time.monotonic() - self._pruned_at >= _PRUNE_INTERVAL:
+                self._pruned_at = time.monotonic()
+                try:
+                    await self.prune_segments()
+                except Exception as e:
+                    logger.error(f"❌ Не удалось удалить старые отметки сегментов: {e}")
+
+    async def start(self) -> None:
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        try:
+            await self.replay()
+        except Exception as e:
+            logger.error(f"❌ Не удалось перенести старые сегменты журнала: {e}")
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            logger.error(f"❌ Журнал не перенесён при остановке, будет при старте: {e}")
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+journal = WriteBehindJournal(
+    JOURNAL_DIR,
+    flush_size=JOURNAL_FLUSH_SIZE,
+    flush_interval=JOURNAL_FLUSH_INTERVAL,
+    fsync=JOURNAL_FSYNC,
+    enabled=WRITE_BEHIND_ENABLED,
+)
@@ -0,0 +1,256 @@
+"""Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+На горячем пути — только словарь и bisect; статистика кэшей, очередей
+и circuit breaker собирается в момент запроса /metrics.
+"""
+
+import logging
+import time
+from bisect import bisect_left
+from typing import Callable, Iterable, Optional
+
+from aiohttp import web
+from sqlalchemy import event
+
+from config import METRICS_HOST, METRICS_PORT
+
+logger = logging.getLogger("metrics")
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+_metrics: list = []
+# Функции без аргументов, возвращающие строки метрик на момент запроса
+_collectors: list[Callable[[], Iterable[str]]] = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[tuple, float] = {}
+        _metrics.append(self)
+
+    def inc(self, *labels, amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in self._values.items():
+            yield f"{self.name}{_labels(self.labels, labels)} {value}"
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help: str, labels: tuple = (), buckets=DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        # labels → [счётчики по корзинам (последняя — +Inf), сумма]
+        self._values: dict[tuple, list] = {}
+        _metrics.append(self)
+
+    def observe(self, value: float, *labels) -> None:
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                le = _labels(self.labels, labels, f'le="{bound}"')
+                yield f"{self.name}_bucket{le} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.labels, labels)} {total}"
+            yield f"{self.name}_count{_labels(self.labels, labels)} {cumulative}"
+
+
+def _samples(
+    name: str, help: str, kind: str, samples: dict, labels: tuple
+) -> Iterable[str]:
+    yield f"# HELP {name} {help}"
+    yield f"# TYPE {name} {kind}"
+    for values, value in samples.items():
+        yield f"{name}{_labels(labels, values)} {value}"
+
+
+def gauge(name: str, help: str, samples: dict, labels: tuple = ()) -> Iterable[str]:
+    """Строки gauge-метрики для коллектора: samples — {значения меток: число}."""
+    return _samples(name, help, "gauge", samples, labels)
+
+
+def counter(name: str, help: str, samples: dict, labels: tuple = ()) -> Iterable[str]:
+    """Строки counter-метрики для коллектора: счётчики, которые ведёт сам
+    компонент (только растут, обнуляются при перезапуске процесса)."""
+    return _samples(name, help, "counter", samples, labels)
+
+
+def register_collector(collector: Callable[[], Iterable[str]]) -> None:
+    _collectors.append(collector)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        try:
+            lines.extend(collector())
+        except Exception as e:
+            logger.warning(f"⚠️ Ошибка сбора метрик {collector.__name__}: {e}")
+    return "\n".join(lines) + "\n"
+
+
+handler_latency = Histogram(
+    "bot_handler_seconds", "Время работы хендлера", ("handler",)
+)
+handler_errors = Counter(
+    "bot_handler_errors_total", "Исключения в хендлерах", ("handler", "error")
+)
+db_statements = Histogram(
+    "bot_db_statement_seconds",
+    "Время выполнения SQL-запросов",
+    ("operation",),
+    DB_BUCKETS,
+)
+throttled_updates = Counter(
+    "bot_throttled_updates_total",
+    "Обновления, отброшенные антифлудом",
+    ("command",),
+)
+http_latency = Histogram(
+    "bot_http_request_seconds", "Время запросов к внешним API", ("service",)
+)
+http_responses = Counter(
+    "bot_http_responses_total",
+    "Ответы внешних API по статусу (timeout/error — без ответа)",
+    ("service", "status"),
+)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._metrics_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = getattr(context, "_metrics_started", None)
+    if started is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement else ""
+    db_statements.observe(time.perf_counter() - started, operation)
+
+
+def instrument_engine(engine) -> None:
+    """Подписывает метрики на запросы движка (AsyncEngine или Engine)."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def collect_app_stats() -> Iterable[str]:
+    """Кэши, circuit breaker и очередь отправки — на момент запроса."""
+    from services.circuit_breaker import CLOSED
+    from services.openfoodfacts import breaker
+    from services.outbound import outbound_queue
+    from services.products import cache_stats as product_stats
+    from utils import user_cache_stats
+
+    caches = {"user_profile": user_cache_stats(), "product": product_stats}
+    for stat in ("hits", "misses"):
+        yield from counter(
+            f"bot_cache_{stat}_total",
+            f"Кэш: {stat}",
+            {(name,): stats[stat] for name, stats in caches.items()},
+            ("cache",),
+        )
+    user_stats = caches["user_profile"]
+    yield from gauge(
+        "bot_cache_size",
+        "Записей в кэше профилей",
+        {("user_profile",): user_stats["size"]},
+        ("cache",),
+    )
+    yield from counter(
+        "bot_cache_evictions_total",
+        "Вытеснения из кэша профилей по размеру",
+        {("user_profile",): user_stats["evictions"]},
+        ("cache",),
+    )
+
+    snapshot = breaker.snapshot()
+    yield from gauge(
+        "bot_circuit_breaker_open",
+        "1 — запросы к сервису не пропускаются (open/half_open)",
+        {(snapshot["name"],): int(snapshot["state"] != CLOSED)},
+        ("service",),
+    )
+    yield from counter(
+        "bot_circuit_breaker_rejected_total",
+        "Запросы, отклонённые circuit breaker",
+        {(snapshot["name"],): snapshot["rejected"]},
+        ("service",),
+    )
+
+    outbound = outbound_queue.stats()
+    yield from gauge(
+        "bot_outbound_depth",
+        "Сообщений в очереди отправки",
+        {(lane,): stats["depth"] for lane, stats in outbound["lanes"].items()},
+        ("lane",),
+    )
+    yield from gauge(
+        "bot_outbound_latency_p95_seconds",
+        "95-й перцентиль задержки отправки",
+        {(lane,): stats["latency_p95"] for lane, stats in outbound["lanes"].items()},
+        ("lane",),
+    )
+    yield from counter(
+        "bot_outbound_messages_total",
+        "Исходящие сообщения по результату",
+        {(result,): outbound[result] for result in ("sent", "retried", "failed")},
+        ("result",),
+    )
+
+
+register_collector(collect_app_stats)
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    return web.Response(
+        text=render_metrics(), content_type="text/plain", charset="utf-8"
+    )
+
+
+async def start_metrics_server(
+    host: str = METRICS_HOST, port: int = METRICS_PORT
+) -> Optional[web.AppRunner]:
+    """Отдельный HTTP-сервер с /metrics; None, если METRICS_PORT=0."""
+    if not port:
+        return None
+    app = web.Application()
+    app.router.add_get("/metrics", metrics_handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"📈 Метрики: http://{host}:{port}/metrics")
+    return runner
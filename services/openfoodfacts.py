@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+from typing import Optional
+
+from config import (
+    OPENFOODFACTS_DEADLINE,
+    OPENFOODFACTS_FAILURE_THRESHOLD,
+    OPENFOODFACTS_HEDGE_DELAY,
+    OPENFOODFACTS_RESET_TIMEOUT,
+)
+from services.circuit_breaker import CircuitBreaker
+from services.http import http_client
+from services.products import normalize_query, store_product
+
+logger = logging.getLogger("food_api")
+
+SEARCH_URL = "https://world.openfoodfacts.org/cgi/search.pl"
+
+breaker = CircuitBreaker(
+    "openfoodfacts",
+    failure_threshold=OPENFOODFACTS_FAILURE_THRESHOLD,
+    reset_timeout=OPENFOODFACTS_RESET_TIMEOUT,
+)
+
+# Нормализованный запрос → выполняющийся поиск (один на все ожидающие хендлеры)
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+class UpstreamError(Exception):
+    pass
+
+
+async def _fetch_products(params: dict) -> list:
+    """Один запрос к OpenFoodFacts; ошибки сети, статуса и парсинга
+    пробрасываются как исключения."""
+    async with http_client.get("openfoodfacts", SEARCH_URL, params=params) as response:
+        logger.info(f"📡 Ответ от OpenFoodFacts: статус {response.status}")
+        if response.status != 200:
+            raise UpstreamError(f"Некорректный статус: {response.status}")
+        text = await response.text()
+
+    try:
+        # Логируем первые 500 символов тела (осторожно: может быть большим)
+        logger.debug(f"📄 Тело ответа (первые 500 симв): {text[:500]}...")
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        logger.debug(f"Полный ответ: {text[:1000]}")
+        raise UpstreamError(f"Ошибка парсинга JSON: {e}") from e
+    return data.get("products", [])
+
+
+def _answered(task: asyncio.Task) -> bool:
+    return task.done() and not task.cancelled() and task.exception() is None
+
+
+def _pick_product(products: list) -> Optional[dict]:
+    for i, product in enumerate(products):
+        name = (
+            product.get("product_name_ru")
+            or product.get("product_name")
+            or ""
+        ).strip()
+
+        nutriments = product.get("nutriments", {})
+        energy_kcal = nutriments.get("energy-kcal_100g")
+
+        if energy_kcal is None:
+            energy_kcal = nutriments.get("energy_100g")
+            if energy_kcal:
+                energy_kcal = round(energy_kcal / 4.184)
+
+        logger.debug(f"  [{i}] {name} → {energy_kcal} ккал/100г")
+
+        if name and energy_kcal and energy_kcal > 0:
+            return {"name": name, "calories_per_100g": int(energy_kcal)}
+    return None
+
+
+async def _search(product_name: str, query: str) -> Optional[dict]:
+    """Поиск по России и глобальный поиск под общим дедлайном.
+
+    Глобальный запрос стартует, если российский не дал продукта за
+    OPENFOODFACTS_HEDGE_DELAY секунд. Российский результат предпочтительнее,
+    но первый найденный продукт возвращается сразу. Промах кэшируется, только
+    если оба запроса завершились без ошибок.
+
+    Автомат защиты получает один исход на поиск (как и один allow()): успех,
+    если хотя бы один запрос получил ответ, иначе — ошибка.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + OPENFOODFACTS_DEADLINE
+
+    russia = asyncio.create_task(
+        _fetch_products(
+            {
+                "search_terms": product_name,
+                "search_simple": 1,
+                "json": 1,
+                "page_size": 5,
+                "tagtype_0": "countries",
+                "tag_contains_0": "russia",
+                "sort_by": "unique_scans_n",
+            }
+        )
+    )
+    world = None
+    tasks = {russia}
+    product = None
+    timed_out = False
+    try:
+        await asyncio.wait(tasks, timeout=OPENFOODFACTS_HEDGE_DELAY)
+        results: dict[asyncio.Task, Optional[dict]] = {}
+
+        while True:
+            for task in [t for t in tasks if t.done() and t not in results]:
+                results[task] = None if task.exception() else _pick_product(task.result())
+            if results.get(russia):
+                product = results[russia]
+                break
+            if world is not None and results.get(world):
+                product = results[world]
+                break
+
+            if world is None:
+                logger.info("🔄 Глобальный поиск (без фильтра России)")
+                world = asyncio.create_task(
+                    _fetch_products(
+                        {
+                            "search_terms": product_name,
+                            "search_simple": 1,
+                            "json": 1,
+                            "page_size": 1,
+                        }
+                    )
+                )
+                tasks.add(world)
+
+            pending = tasks - set(results)
+            if not pending:
+                break
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                logger.warning(f"⏱️ OpenFoodFacts не ответил за {OPENFOODFACTS_DEADLINE} с")
+                timed_out = True
+                break
+            await asyncio.wait(
+                pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED
+            )
+    except asyncio.CancelledError:
+        # Поиск отменён без результата — пробный запрос не засчитываем
+        breaker.release()
+        raise
+    except Exception:
+        breaker.record_failure()
+        raise
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if any(_answered(task) for task in tasks):
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+    if product or timed_out:
+        return product
+    errors = [task.exception() for task in tasks if task.exception()]
+    if errors:
+        logger.error(f"🌐 Ошибка при запросе к OpenFoodFacts: {errors[0]}")
+        return None
+
+    logger.warning("❌ Подходящих продуктов с калориями не найдено")
+    await store_product(query, None)
+    return None
+
+
+async def _search_and_store(product_name: str, query: str) -> Optional[dict]:
+    logger.info(f"🔍 Запрос к OpenFoodFacts: {product_name}")
+    try:
+        product = await _search(product_name, query)
+    except Exception as e:
+        logger.exception(f"💥 Неожиданная ошибка в search_openfoodfacts: {e}")
+        return None
+    if product:
+        logger.info(f"✅ Найден продукт: {product}")
+        await store_product(query, product)
+    return product
+
+
+async def search_openfoodfacts(product_name: str) -> Optional[dict]:
+    """Ищет продукт в OpenFoodFacts; при разомкнутом автомате защиты сразу
+    возвращает None. Одинаковые запросы выполняются один раз."""
+    query = normalize_query(product_name)
+    task = _in_flight.get(query)
+    if task is None:
+        if not breaker.allow():
+            logger.warning("⚡ OpenFoodFacts недоступен, запрос не отправлен")
+            return None
+        task = asyncio.create_task(_search_and_store(product_name, query))
+        _in_flight[query] = task
+        task.add_done_callback(lambda _: _in_flight.pop(query, None))
+    # shield: отмена одного хендлера не отменяет общий поиск
+    return await asyncio.shield(task)
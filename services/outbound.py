@@ -0,0 +1,311 @@
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Optional
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import (
+    BaseRequestMiddleware,
+    NextRequestMiddlewareType,
+)
+from aiogram.exceptions import TelegramRetryAfter, TelegramServerError
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import Response, TelegramType
+from cachetools import TTLCache
+
+from config import (
+    OUTBOUND_CHAT_BURST,
+    OUTBOUND_CHAT_RATE,
+    OUTBOUND_GLOBAL_RATE,
+    OUTBOUND_MAX_RETRIES,
+    OUTBOUND_WORKERS,
+)
+from services.rate_limit import TokenBucket
+
+logger = logging.getLogger("outbound")
+
+# Полосы приоритета: меньше — раньше
+INTERACTIVE, BULK = 0, 1
+LANE_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+# Полоса, в которую уходят запросы к Bot API из текущего контекста;
+# None — отправка напрямую, мимо очереди.
+_current_lane: ContextVar[Optional[int]] = ContextVar("outbound_lane", default=None)
+
+
+@contextmanager
+def outbound_lane(lane: Optional[int]):
+    """Отправлять сообщения из этого блока через очередь с полосой lane."""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class _Outgoing:
+    __slots__ = (
+        "lane",
+        "chat_id",
+        "make_request",
+        "bot",
+        "method",
+        "future",
+        "enqueued_at",
+        "attempts",
+    )
+
+    def __init__(self, lane, chat_id, make_request, bot, method):
+        self.lane = lane
+        self.chat_id = chat_id
+        self.make_request = make_request
+        self.bot = bot
+        self.method = method
+        self.future = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class _ChatLine:
+    """Очередь одного чата: сообщения уходят строго по порядку, и в общей
+    очереди, на таймере или в отправке находится не больше одной строки чата."""
+
+    __slots__ = ("chat_id", "bucket", "items")
+
+    def __init__(self, chat_id, bucket: TokenBucket):
+        self.chat_id = chat_id
+        self.bucket = bucket
+        self.items: deque[_Outgoing] = deque()
+
+
+class OutboundQueue:
+    """Очередь исходящих запросов к Bot API с лимитами Telegram.
+
+    Общий лимит (около 30 сообщений в секунду на бота) и лимит на чат —
+    корзины токенов. У каждого чата своя очередь FIFO: если чат исчерпал
+    лимит, откладывается весь чат, а не одно сообщение, и не занимает воркер,
+    поэтому остальные чаты не ждут, а порядок сообщений в чате сохраняется.
+    TelegramRetryAfter приостанавливает чат и общий лимит на retry_after
+    секунд; запрос остаётся первым в очереди чата.
+    """
+
+    def __init__(
+        self,
+        workers: int = OUTBOUND_WORKERS,
+        global_rate: float = OUTBOUND_GLOBAL_RATE,
+        chat_rate: float = OUTBOUND_CHAT_RATE,
+        chat_burst: int = OUTBOUND_CHAT_BURST,
+        max_retries: int = OUTBOUND_MAX_RETRIES,
+    ):
+        self.workers = workers
+        self.max_retries = max_retries
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self._global = TokenBucket(global_rate, global_rate)
+        # Корзина чата, простаивающего дольше минуты, всё равно была бы полной
+        self._buckets: TTLCache = TTLCache(maxsize=100_000, ttl=60)
+        # Пауза после RetryAfter может быть длиннее минуты: срок храним отдельно
+        self._paused_until: dict[Any, float] = {}
+        # Чаты с неотправленными сообщениями
+        self._lines: dict[Any, _ChatLine] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._sequence = itertools.count()
+        self._tasks: list[asyncio.Task] = []
+        # Все неотправленные запросы: в очереди, отложенные и в отправке
+        self._items: set[_Outgoing] = set()
+        self._depth = {lane: 0 for lane in LANE_NAMES}
+        self._latencies = {lane: deque(maxlen=1000) for lane in LANE_NAMES}
+        self._counters = {"sent": 0, "retried": 0, "failed": 0}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._buckets.get(chat_id)
+        if bucket is None:
+            bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            paused = self._paused_until.get(chat_id, 0) - time.monotonic()
+            if paused > 0:
+                bucket.pause(paused)
+        # Перезаписываем, чтобы продлить TTL активного чата
+        self._buckets[chat_id] = bucket
+        return bucket
+
+    def _pause_chat(self, line: _ChatLine, delay: float) -> None:
+        now = time.monotonic()
+        line.bucket.pause(delay)
+        for chat_id, deadline in list(self._paused_until.items()):
+            if deadline <= now:
+                del self._paused_until[chat_id]
+        self._paused_until[line.chat_id] = now + delay
+
+    def _put(self, line: _ChatLine) -> None:
+        if self._queue is None:
+            # Очередь остановлена, пока чат ждал
+            return
+        # Приоритет чата — полоса его первого сообщения
+        self._queue.put_nowait((line.items[0].lane, next(self._sequence), line))
+
+    def _release(self, line: _ChatLine) -> None:
+        """Возвращает чат в очередь после отправки или снимает его, если
+        сообщений больше нет."""
+        if line.items:
+            self._put(line)
+            return
+        del self._lines[line.chat_id]
+        self._buckets[line.chat_id] = line.bucket
+
+    async def submit(
+        self,
+        lane: int,
+        chat_id,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        item = _Outgoing(lane, chat_id, make_request, bot, method)
+        self._depth[lane] += 1
+        self._items.add(item)
+        line = self._lines.get(chat_id)
+        if line is None:
+            line = self._lines[chat_id] = _ChatLine(chat_id, self._chat_bucket(chat_id))
+            line.items.append(item)
+            self._put(line)
+        else:
+            # Чат уже в очереди, отложен или отправляется
+            line.items.append(item)
+        return await item.future
+
+    def _drop(self, item: _Outgoing) -> None:
+        self._depth[item.lane] -= 1
+        self._items.discard(item)
+
+    def _finish(self, item: _Outgoing) -> None:
+        self._drop(item)
+        self._latencies[item.lane].append(time.monotonic() - item.enqueued_at)
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            _, _, line = await self._queue.get()
+            item = line.items[0]
+            if item.future.done():
+                # Отправитель отменил ожидание
+                line.items.popleft()
+                self._drop(item)
+                self._release(line)
+                continue
+
+            wait = line.bucket.reserve()
+            if wait > 0:
+                loop.call_later(wait, self._put, line)
+                continue
+
+            await self._global.acquire()
+            try:
+                result = await item.make_request(item.bot, item.method)
+            except (TelegramRetryAfter, TelegramServerError) as e:
+                item.attempts += 1
+                if item.attempts > self.max_retries:
+                    self._counters["failed"] += 1
+                    line.items.popleft()
+                    self._finish(item)
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                    self._release(line)
+                    continue
+                delay = (
+                    e.retry_after
+                    if isinstance(e, TelegramRetryAfter)
+                    else min(2**item.attempts, 30)
+                )
+                self._pause_chat(line, delay)
+                if isinstance(e, TelegramRetryAfter):
+                    # Флуд-контроль Telegram считает все сообщения бота
+                    self._global.pause(delay)
+                self._counters["retried"] += 1
+                logger.warning(
+                    f"⏳ Повтор отправки в чат {item.chat_id} через {delay} с: {e}"
+                )
+                # Весь чат ждёт: следующие сообщения не обгонят этот запрос
+                loop.call_later(delay, self._put, line)
+            except Exception as e:
+                self._counters["failed"] += 1
+                line.items.popleft()
+                self._finish(item)
+                if not item.future.done():
+                    item.future.set_exception(e)
+                self._release(line)
+            else:
+                self._counters["sent"] += 1
+                line.items.popleft()
+                self._finish(item)
+                if not item.future.done():
+                    item.future.set_result(result)
+                self._release(line)
+
+    async def start(self) -> None:
+        if self._tasks:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._tasks = [
+            asyncio.create_task(self._worker()) for _ in range(self.workers)
+        ]
+        logger.info(f"📤 Очередь отправки запущена ({self.workers} воркеров)")
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._queue = None
+        # Запросы в очереди, отложенные через call_later и прерванные
+        # на отправке: отправители не должны ждать вечно
+        for item in self._items:
+            if not item.future.done():
+                item.future.cancel()
+        self._items.clear()
+        self._lines.clear()
+        self._depth = {lane: 0 for lane in LANE_NAMES}
+
+    def stats(self) -> dict:
+        """Глубина очереди и задержка от постановки до отправки по полосам."""
+        lanes = {}
+        for lane, name in LANE_NAMES.items():
+            latencies = sorted(self._latencies[lane])
+            lanes[name] = {
+                "depth": self._depth[lane],
+                "latency_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+                "latency_p95": (
+                    latencies[int(len(latencies) * 0.95)] if latencies else 0.0
+                ),
+            }
+        return {**self._counters, "lanes": lanes}
+
+
+outbound_queue = OutboundQueue()
+
+
+class OutboundRequestMiddleware(BaseRequestMiddleware):
+    """Middleware сессии бота: запросы к чатам из контекста outbound_lane
+    идут через очередь, остальные — напрямую."""
+
+    def __init__(self, queue: OutboundQueue = outbound_queue):
+        self.queue = queue
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ) -> Response[TelegramType]:
+        lane = _current_lane.get()
+        chat_id: Any = getattr(method, "chat_id", None)
+        if lane is None or chat_id is None or not self.queue.running:
+            return await make_request(bot, method)
+        return await self.queue.submit(lane, chat_id, make_request, bot, method)
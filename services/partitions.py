@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import re
+from datetime import date, datetime, timezone
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from config import (
+    LOG_RETENTION_MONTHS,
+    PARTITION_MAINTENANCE_INTERVAL,
+    PARTITION_MONTHS_AHEAD,
+)
+
+logger = logging.getLogger("partitions")
+
+PARTITIONED_TABLES = ("water_logs", "food_logs", "workout_logs")
+
+_PARTITION_RE = re.compile(r"_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(month: date, count: int) -> date:
+    years, month_index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+async def is_partitioned(conn: AsyncConnection, table: str) -> bool:
+    result = await conn.execute(
+        text("SELECT relkind FROM pg_class WHERE relname = :table"),
+        {"table": table},
+    )
+    return result.scalar() == "p"
+
+
+async def list_partitions(conn: AsyncConnection, table: str) -> dict[date, str]:
+    """Возвращает {первое число месяца: имя партиции} для таблицы."""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ),
+        {"table": table},
+    )
+    partitions = {}
+    for (name,) in result:
+        match = _PARTITION_RE.search(name)
+        if match:
+            partitions[date(int(match[1]), int(match[2]), 1)] = name
+    return partitions
+
+
+async def create_partition(conn: AsyncConnection, table: str, month: date) -> None:
+    # Индекс (telegram_id, logged_at) объявлен на родительской таблице,
+    # Postgres сам создаёт его копию в каждой новой партиции.
+    await conn.execute(
+        text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, month)} "
+            f"PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') "
+            f"TO ('{add_months(month, 1).isoformat()}')"
+        )
+    )
+
+
+async def ensure_partitions(
+    conn: AsyncConnection,
+    *,
+    start: date | None = None,
+    months_ahead: int = PARTITION_MONTHS_AHEAD,
+    retention_months: int = LOG_RETENTION_MONTHS,
+) -> None:
+    """Создаёт партиции от start (по умолчанию — текущий месяц) до текущего
+    месяца + months_ahead и удаляет партиции старше retention_months."""
+    if conn.dialect.name != "postgresql":
+        return
+
+    current = month_start(datetime.now(timezone.utc).date())
+    first = month_start(start) if start else current
+    last = add_months(current, months_ahead)
+
+    for table in PARTITIONED_TABLES:
+        if not await is_partitioned(conn, table):
+            logger.warning(
+                f"⚠️ Таблица {table} не партиционирована — "
+                "запустите scripts.migrate_partitions"
+            )
+            continue
+
+        existing = await list_partitions(conn, table)
+        month = first
+        while month <= last:
+            if month not in existing:
+                await create_partition(conn, table, month)
+                logger.info(f"🧱 Создана партиция {partition_name(table, month)}")
+            month = add_months(month, 1)
+
+        if retention_months <= 0:
+            continue
+        cutoff = add_months(current, -retention_months)
+        for month, name in sorted(existing.items()):
+            if month < cutoff:
+                await conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+                await conn.execute(text(f"DROP TABLE {name}"))
+                logger.info(f"🗑️ Удалена устаревшая партиция {name}")
+
+
+async def run_partition_maintenance(
+    engine, interval: int = PARTITION_MAINTENANCE_INTERVAL
+) -> None:
+    """Фоновая задача: периодически поддерживает набор партиций."""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            async with engine.begin() as conn:
+                await ensure_partitions(conn)
+        except Exception as e:
+            logger.exception(f"💥 Ошибка обслуживания партиций: {e}")
@@ -0,0 +1,98 @@
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from cachetools import TLRUCache
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+
+from config import PRODUCT_CACHE_SIZE, PRODUCT_CACHE_TTL, PRODUCT_MISS_TTL
+from database import AsyncSessionLocal
+from models.models import Product
+
+logger = logging.getLogger("product_cache")
+
+_PUNCTUATION_RE = re.compile(r"[^\w\s%-]+")
+_CYRILLIC_RE = re.compile(r"[а-я]")
+
+# Латинские буквы, которые на глаз не отличить от кириллических («гречкa»)
+_LATIN_LOOKALIKES = str.maketrans("aeopcxykmt", "аеорсхукмт")
+
+
+def _ttl(product: Optional[dict]) -> int:
+    return PRODUCT_CACHE_TTL if product is not None else PRODUCT_MISS_TTL
+
+
+# Нормализованный запрос → {"name", "calories_per_100g"} или None (не найден)
+_product_cache = TLRUCache(
+    maxsize=PRODUCT_CACHE_SIZE,
+    ttu=lambda _key, product, now: now + _ttl(product),
+)
+
+cache_stats = {"hits": 0, "misses": 0}
+
+
+def normalize_query(text: str) -> str:
+    """«  Гречка, ядрица » → «гречка ядрица»; «гречкa» (латинская a) → «гречка»"""
+    text = text.casefold().replace("ё", "е")
+    text = _PUNCTUATION_RE.sub(" ", text)
+    return " ".join(
+        word.translate(_LATIN_LOOKALIKES) if _CYRILLIC_RE.search(word) else word
+        for word in text.split()
+    )
+
+
+async def get_cached_product(query: str) -> tuple[bool, Optional[dict]]:
+    """Возвращает (есть_в_кэше, продукт). Продукт None при закэшированном промахе."""
+    try:
+        product = _product_cache[query]
+        cache_stats["hits"] += 1
+        return True, product
+    except KeyError:
+        pass
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(Product.name, Product.calories_per_100g)
+            .where(Product.query == query)
+            .where(Product.expires_at > datetime.now(timezone.utc))
+        )
+        row = result.one_or_none()
+
+    if row is None:
+        cache_stats["misses"] += 1
+        return False, None
+
+    cache_stats["hits"] += 1
+    product = (
+        {"name": row.name, "calories_per_100g": row.calories_per_100g}
+        if row.name is not None
+        else None
+    )
+    _product_cache[query] = product
+    return True, product
+
+
+async def store_product(query: str, product: Optional[dict]) -> None:
+    """Сохраняет результат поиска (или промах) в память и в таблицу products."""
+    _product_cache[query] = product
+
+    values = {
+        "query": query,
+        "name": product["name"] if product else None,
+        "calories_per_100g": product["calories_per_100g"] if product else None,
+        "expires_at": datetime.now(timezone.utc) + timedelta(seconds=_ttl(product)),
+    }
+    stmt = insert(Product).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Product.query],
+        set_={key: stmt.excluded[key] for key in values if key != "query"},
+    )
+    try:
+        async with AsyncSessionLocal() as session:
+            await session.execute(stmt)
+            await session.commit()
+    except Exception as e:
+        # Кэш в памяти уже обновлён, потеря L2-записи не критична
+        logger.warning(f"⚠️ Не удалось сохранить продукт {query!r} в БД: {e}")
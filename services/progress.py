@@ -0,0 +1,158 @@
+import logging
+import uuid
+from datetime import date
+from typing import Iterable, NamedTuple, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import and_, func, select
+
+from config import PROFILE_INVALIDATION_CHANNEL, PROGRESS_CACHE_SIZE, PROGRESS_CACHE_TTL
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from database import read_scope
+from models.models import DailyTotal, User
+from services.journal import journal
+from services.redis_client import get_redis
+from services.timezones import local_today
+from services.totals import DayTotals
+
+logger = logging.getLogger("progress")
+
+
+class ProgressSnapshot(NamedTuple):
+    day: date
+    water_goal: int
+    calorie_goal: int
+    water_ml: int
+    calories_eaten: int
+    calories_burned: int
+
+
+# Снимок прогресса за сегодня: telegram_id → ProgressSnapshot
+_progress_cache = TTLCache(maxsize=PROGRESS_CACHE_SIZE, ttl=PROGRESS_CACHE_TTL)
+
+# Инвалидации прогресса идут по каналу профилей с этим префиксом
+PROGRESS_INVALIDATION_PREFIX = "progress:"
+# Метка процесса: свои сообщения не применяем — снимок этого процесса уже
+# обновлён после записи
+_ORIGIN = uuid.uuid4().hex
+
+
+def progress_statement(telegram_id: int, day: date):
+    """Цели пользователя и итоги дня одним запросом."""
+    return (
+        select(
+            User.water_goal,
+            User.calorie_goal,
+            func.coalesce(DailyTotal.water_ml, 0),
+            func.coalesce(DailyTotal.calories_eaten, 0),
+            func.coalesce(DailyTotal.calories_burned, 0),
+        )
+        .outerjoin(
+            DailyTotal,
+            and_(
+                DailyTotal.telegram_id == User.telegram_id,
+                DailyTotal.day == day,
+            ),
+        )
+        .where(User.telegram_id == telegram_id)
+    )
+
+
+async def get_progress(
+    user, session: Optional[AsyncSession] = None
+) -> Optional[ProgressSnapshot]:
+    """Возвращает снимок прогресса пользователя (профиль из get_user_profile)
+    за сегодня по его местному времени или None, если профиля нет в БД.
+
+    session — сессия обновления: читаем через неё, если реплика недоступна.
+    """
+    telegram_id = user.telegram_id
+    today = local_today(user.timezone)
+    snapshot = _progress_cache.get(telegram_id)
+    if snapshot is not None and snapshot.day == today:
+        logger.debug(f"✅ Кэш прогресса hit для пользователя {telegram_id}")
+        return snapshot
+
+    async with read_scope(session, telegram_id) as reader:
+        result = await reader.execute(progress_statement(telegram_id, today))
+        row = result.one_or_none()
+
+    if row is None:
+        return None
+
+    # Записи из журнала отложенной записи, которые ещё не дошли до БД
+    pending = journal.pending_totals(telegram_id, today)
+    snapshot = ProgressSnapshot(
+        today,
+        row[0],
+        row[1],
+        *(stored + unflushed for stored, unflushed in zip(row[2:], pending)),
+    )
+    _progress_cache[telegram_id] = snapshot
+    return snapshot
+
+
+def remember_totals(
+    telegram_id: int, user, totals: DayTotals, day: date
+) -> ProgressSnapshot:
+    """Кладёт в кэш свежие итоги дня после записи (вызывать после commit)."""
+    snapshot = ProgressSnapshot(day, user.water_goal, user.calorie_goal, *totals)
+    _progress_cache[telegram_id] = snapshot
+    return snapshot
+
+
+async def add_to_progress(
+    user, delta: DayTotals, day: date, session: Optional[AsyncSession] = None
+) -> ProgressSnapshot:
+    """Прибавляет записанное, но ещё не перенесённое в БД к снимку прогресса.
+
+    Вызывать после journal.append: при промахе кэша снимок читается из БД
+    вместе с журналом и уже содержит delta.
+    """
+    snapshot = _progress_cache.get(user.telegram_id)
+    if snapshot is None or snapshot.day != day:
+        return await get_progress(user, session)
+
+    snapshot = snapshot._replace(
+        water_ml=snapshot.water_ml + delta.water_ml,
+        calories_eaten=snapshot.calories_eaten + delta.calories_eaten,
+        calories_burned=snapshot.calories_burned + delta.calories_burned,
+    )
+    _progress_cache[user.telegram_id] = snapshot
+    return snapshot
+
+
+def invalidate_progress(telegram_id: int) -> None:
+    """Удаляет снимок из кэша (цели в профиле изменились)."""
+    _progress_cache.pop(telegram_id, None)
+
+
+def clear_progress_cache() -> None:
+    _progress_cache.clear()
+
+
+async def broadcast_progress_invalidation(telegram_ids: Iterable[int]) -> None:
+    """Сообщает остальным воркерам (через Redis), что итоги дня этих
+    пользователей изменились. Вызывать после commit записи в логи."""
+    redis = get_redis()
+    ids = ",".join(str(telegram_id) for telegram_id in set(telegram_ids))
+    if redis is None or not ids:
+        return
+    try:
+        await redis.publish(
+            PROFILE_INVALIDATION_CHANNEL,
+            f"{PROGRESS_INVALIDATION_PREFIX}{_ORIGIN}:{ids}",
+        )
+    except Exception as e:
+        # Другие воркеры догонят по TTL кэша
+        logger.warning(f"⚠️ Не удалось разослать инвалидацию прогресса: {e}")
+
+
+def parse_progress_invalidation(message: str) -> list[int]:
+    """Пользователи из сообщения broadcast_progress_invalidation; пустой
+    список — если сообщение отправил этот же процесс."""
+    origin, ids = message[len(PROGRESS_INVALIDATION_PREFIX):].split(":", 1)
+    if origin == _ORIGIN:
+        return []
+    return [int(telegram_id) for telegram_id in ids.split(",")]
@@ -0,0 +1,24 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+
+from config import REDIS_URL
+
+_redis: Optional[Redis] = None
+
+
+def get_redis() -> Optional[Redis]:
+    """Общий клиент Redis или None, если REDIS_URL не задан."""
+    global _redis
+    if not REDIS_URL:
+        return None
+    if _redis is None:
+        _redis = Redis.from_url(REDIS_URL)
+    return _redis
+
+
+async def close_redis() -> None:
+    global _redis
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
@@ -0,0 +1,450 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from sqlalchemy import and_, func, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import (
+    DEFAULT_TIMEZONE,
+    REMINDER_BATCH_SIZE,
+    REMINDER_INTERVAL_MINUTES,
+    REMINDER_LOAD_AHEAD,
+    REMINDER_QUIET_END,
+    REMINDER_QUIET_START,
+    REMINDER_RETRY_DELAY,
+    REMINDER_SEND_RETRIES,
+)
+from database import AsyncSessionLocal, after_commit, commit_session
+from models.models import DailyTotal, ReminderSchedule, User
+from services.journal import journal
+from services.outbound import BULK, outbound_lane
+from services.timezones import get_zone, local_day, local_day_sql
+
+logger = logging.getLogger("reminders")
+
+# Ключ advisory-блокировки: пачку напоминаний отправляет только один процесс
+_LOCK_KEY = 0x72656D69  # "remi"
+
+# Ошибки Bot API, после которых напоминание стоит повторить
+_TRANSIENT_ERRORS = (TelegramNetworkError, TelegramServerError, TelegramRetryAfter)
+
+
+class ReminderSettings(NamedTuple):
+    enabled: bool
+    interval_minutes: int
+    quiet_start: int
+    quiet_end: int
+    next_run_at: Optional[datetime]
+
+
+def in_quiet_hours(hour: int, quiet_start: int, quiet_end: int) -> bool:
+    if quiet_start == quiet_end:
+        return False
+    if quiet_start < quiet_end:
+        return quiet_start <= hour < quiet_end
+    # Тихие часы через полночь, например 22–8
+    return hour >= quiet_start or hour < quiet_end
+
+
+def next_allowed_time(
+    moment: datetime, quiet_start: int, quiet_end: int, zone: ZoneInfo
+) -> datetime:
+    """Ближайший момент не раньше moment вне тихих часов (по времени zone)."""
+    local = moment.astimezone(zone)
+    if not in_quiet_hours(local.hour, quiet_start, quiet_end):
+        return moment
+    wake_up = local.replace(hour=quiet_end, minute=0, second=0, microsecond=0)
+    if wake_up <= local:
+        wake_up += timedelta(days=1)
+    return wake_up.astimezone(timezone.utc)
+
+
+def _tomorrow(now: datetime, zone: ZoneInfo) -> datetime:
+    """Начало следующего дня пользователя, по которому считаются итоги."""
+    tomorrow = now.astimezone(zone).date() + timedelta(days=1)
+    return datetime.combine(tomorrow, datetime.min.time(), tzinfo=zone).astimezone(timezone.utc)
+
+
+def _reminder_text(water_ml: int, water_goal: int) -> str:
+    return (
+        "💧 Не забудь попить воды!\n"
+        f"Сегодня выпито {water_ml} из {water_goal} мл, "
+        f"осталось {water_goal - water_ml} мл.\n"
+        "Записать: /log_water"
+    )
+
+
+class ReminderScheduler:
+    """Планировщик напоминаний о воде.
+
+    Расписание хранится в reminder_schedules, в памяти — только напоминания
+    на ближайшие load_ahead секунд, в куче по времени срабатывания. Отменённые
+    и перенесённые записи из кучи не удаляются, а пропускаются при извлечении
+    (актуальное время — в _due).
+
+    При нескольких процессах бота каждый держит свою кучу, а пачку отправляет
+    под advisory-блокировкой, сверяя next_run_at с БД: напоминание, которое
+    уже отправил или перенёс другой процесс, пропускается.
+
+    Напоминание, которое не удалось отправить из-за сети или ошибки Telegram,
+    повторяется через REMINDER_RETRY_DELAY секунд (пауза удваивается, не больше
+    REMINDER_SEND_RETRIES раз); пачка, упавшая до отправки, — тоже.
+    """
+
+    def __init__(
+        self,
+        load_ahead: int = REMINDER_LOAD_AHEAD,
+        batch_size: int = REMINDER_BATCH_SIZE,
+    ):
+        self.load_ahead = load_ahead
+        self.batch_size = batch_size
+        self._heap: list[tuple[float, int]] = []
+        self._due: dict[int, float] = {}
+        # Неудачные попытки отправки подряд — для паузы перед повтором
+        self._send_failures: dict[int, int] = {}
+        self._loaded_until = 0.0
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    def schedule(self, telegram_id: int, run_at: Optional[datetime]) -> None:
+        """Обновляет время напоминания в памяти (в БД его пишет вызывающий)."""
+        if not self._running:
+            return
+        self._due.pop(telegram_id, None)
+        if run_at is not None:
+            self._push(telegram_id, run_at.timestamp())
+        self._wakeup.set()
+
+    def _push(self, telegram_id: int, timestamp: float) -> None:
+        # Дальше окна не держим — подгрузится из БД, когда придёт время
+        if timestamp > self._loaded_until:
+            return
+        self._due[telegram_id] = timestamp
+        heapq.heappush(self._heap, (timestamp, telegram_id))
+
+    async def _load(self, until: float) -> None:
+        async with AsyncSessionLocal() as session:
+            result = await session.stream(
+                select(ReminderSchedule.telegram_id, ReminderSchedule.next_run_at)
+                .where(ReminderSchedule.enabled.is_(True))
+                .where(
+                    ReminderSchedule.next_run_at
+                    <= datetime.fromtimestamp(until, timezone.utc)
+                )
+                .execution_options(yield_per=self.batch_size)
+            )
+            self._loaded_until = until
+            async for telegram_id, next_run_at in result:
+                if telegram_id not in self._due:
+                    self._push(telegram_id, next_run_at.timestamp())
+
+    def _pop_due(self, now: float) -> list[int]:
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            timestamp, telegram_id = heapq.heappop(self._heap)
+            if self._due.get(telegram_id) != timestamp:
+                continue
+            del self._due[telegram_id]
+            batch.append(telegram_id)
+        return batch
+
+    def _retry_later(self, batch: list[int], delay: float) -> None:
+        retry_at = time.time() + delay
+        for telegram_id in batch:
+            # Время могли переставить, пока ждали блокировку
+            if telegram_id not in self._due:
+                self._push(telegram_id, retry_at)
+
+    async def _fire(self, bot: Bot, batch: list[int]) -> None:
+        now = datetime.now(timezone.utc)
+
+        async with AsyncSessionLocal() as session:
+            locked = await session.execute(
+                text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+            )
+            if not locked.scalar():
+                # Пачку сейчас отправляет другой процесс — сверимся с БД позже
+                self._retry_later(batch, 1)
+                return
+
+            # Цели и итоги дня всей пачки — одним запросом
+            result = await session.execute(
+                select(
+                    ReminderSchedule.telegram_id,
+                    ReminderSchedule.next_run_at,
+                    ReminderSchedule.enabled,
+                    ReminderSchedule.interval_minutes,
+                    ReminderSchedule.quiet_start,
+                    ReminderSchedule.quiet_end,
+                    User.timezone,
+                    User.water_goal,
+                    func.coalesce(DailyTotal.water_ml, 0),
+                )
+                .join(User, User.telegram_id == ReminderSchedule.telegram_id)
+                .outerjoin(
+                    DailyTotal,
+                    and_(
+                        DailyTotal.telegram_id == ReminderSchedule.telegram_id,
+                        # Сегодня — по местному времени каждого пользователя
+                        DailyTotal.day == local_day_sql(User.timezone, now),
+                    ),
+                )
+                .where(ReminderSchedule.telegram_id.in_(batch))
+            )
+
+            updates = []
+            to_send = []
+            for (
+                telegram_id,
+                scheduled_at,
+                enabled,
+                interval_minutes,
+                quiet_start,
+                quiet_end,
+                tz,
+                water_goal,
+                water_ml,
+            ) in result:
+                if not enabled:
+                    continue
+                if scheduled_at > now:
+                    # Запись в куче устарела: напоминание уже отправил или
+                    # перенёс другой процесс
+                    if telegram_id not in self._due:
+                        self._push(telegram_id, scheduled_at.timestamp())
+                    continue
+                zone = get_zone(tz)
+                today = local_day(tz, now)
+                water_ml += journal.pending_totals(telegram_id, today).water_ml
+                if in_quiet_hours(now.astimezone(zone).hour, quiet_start, quiet_end):
+                    next_run_at = next_allowed_time(now, quiet_start, quiet_end, zone)
+                elif water_ml >= water_goal:
+                    # Норма на сегодня выполнена — до завтра не беспокоим
+                    next_run_at = next_allowed_time(
+                        _tomorrow(now, zone), quiet_start, quiet_end, zone
+                    )
+                else:
+                    to_send.append((telegram_id, water_ml, water_goal))
+                    next_run_at = next_allowed_time(
+                        now + timedelta(minutes=interval_minutes),
+                        quiet_start,
+                        quiet_end,
+                        zone,
+                    )
+                updates.append({"telegram_id": telegram_id, "next_run_at": next_run_at})
+
+            # Сначала сдвигаем расписание (коммит снимает блокировку): после
+            # падения напоминание скорее потеряется, чем придёт дважды.
+            if updates:
+                await session.execute(update(ReminderSchedule), updates)
+                await session.commit()
+
+        for row in updates:
+            self._push(row["telegram_id"], row["next_run_at"].timestamp())
+
+        # Пачка уходит в нижнюю полосу очереди отправки: лимиты Telegram
+        # соблюдает очередь, ответы пользователям идут вперёд.
+        with outbound_lane(BULK):
+            results = await asyncio.gather(
+                *(
+                    bot.send_message(telegram_id, _reminder_text(water_ml, water_goal))
+                    for telegram_id, water_ml, water_goal in to_send
+                ),
+                return_exceptions=True,
+            )
+        next_runs = {row["telegram_id"]: row["next_run_at"] for row in updates}
+        failed = {}
+        for (telegram_id, _, _), result in zip(to_send, results):
+            if isinstance(result, TelegramForbiddenError):
+                # Пользователь заблокировал бота
+                self._send_failures.pop(telegram_id, None)
+                async with AsyncSessionLocal() as session:
+                    await save_reminder_settings(session, telegram_id, enabled=False)
+                    await commit_session(session)
+            elif isinstance(result, TelegramAPIError) and not isinstance(
+                result, _TRANSIENT_ERRORS
+            ):
+                # Повтор не поможет (например, чат не найден)
+                self._send_failures.pop(telegram_id, None)
+                logger.warning(
+                    f"⚠️ Не удалось отправить напоминание {telegram_id}: {result}"
+                )
+            elif isinstance(result, Exception):
+                failed[telegram_id] = next_runs[telegram_id]
+                logger.warning(
+                    f"⚠️ Не удалось отправить напоминание {telegram_id}, "
+                    f"повторим: {result!r}"
+                )
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                self._send_failures.pop(telegram_id, None)
+        if failed:
+            await self._retry_failed(failed)
+
+        if to_send:
+            sent = len(to_send) - len(failed)
+            logger.info(f"💧 Отправлено напоминаний: {sent} из {len(batch)}")
+
+    async def _retry_failed(self, failed: dict[int, datetime]) -> None:
+        """Возвращает неотправленные напоминания в расписание через короткую
+        паузу. failed — telegram_id → next_run_at, записанный перед отправкой:
+        если его уже поменяли (/reminders), повтор не нужен."""
+        now = datetime.now(timezone.utc)
+        rescheduled = []
+        async with AsyncSessionLocal() as session:
+            for telegram_id, next_run_at in failed.items():
+                attempts = self._send_failures.get(telegram_id, 0) + 1
+                if attempts > REMINDER_SEND_RETRIES:
+                    # Сдаёмся до следующего интервала — он уже в расписании
+                    self._send_failures.pop(telegram_id, None)
+                    continue
+                self._send_failures[telegram_id] = attempts
+                retry_at = now + timedelta(
+                    seconds=REMINDER_RETRY_DELAY * 2 ** (attempts - 1)
+                )
+                result = await session.execute(
+                    update(ReminderSchedule)
+                    .where(ReminderSchedule.telegram_id == telegram_id)
+                    .where(ReminderSchedule.next_run_at == next_run_at)
+                    .values(next_run_at=retry_at)
+                    .returning(ReminderSchedule.telegram_id)
+                )
+                if result.scalar_one_or_none() is not None:
+                    rescheduled.append((telegram_id, retry_at))
+                else:
+                    self._send_failures.pop(telegram_id, None)
+            await session.commit()
+        for telegram_id, retry_at in rescheduled:
+            self._push(telegram_id, retry_at.timestamp())
+
+    async def run(self, bot: Bot) -> None:
+        """Фоновая задача планировщика."""
+        self._running = True
+        try:
+            while True:
+                try:
+                    now = time.time()
+                    if now + self.load_ahead / 2 >= self._loaded_until:
+                        await self._load(now + self.load_ahead)
+
+                    batch = self._pop_due(now)
+                    if batch:
+                        try:
+                            await self._fire(bot, batch)
+                        except Exception:
+                            # Пачка уже снята с кучи: без повтора она вернулась бы
+                            # только со следующей подгрузкой из БД
+                            self._retry_later(batch, REMINDER_RETRY_DELAY)
+                            raise
+                        continue
+
+                    wake_at = self._loaded_until - self.load_ahead / 2
+                    if self._heap:
+                        wake_at = min(wake_at, self._heap[0][0])
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(
+                            self._wakeup.wait(), timeout=max(wake_at - now, 0)
+                        )
+                    except asyncio.TimeoutError:
+                        pass
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.exception(f"💥 Ошибка планировщика напоминаний: {e}")
+                    await asyncio.sleep(5)
+        finally:
+            self._running = False
+            self._heap.clear()
+            self._due.clear()
+            self._send_failures.clear()
+            self._loaded_until = 0.0
+
+
+reminder_scheduler = ReminderScheduler()
+
+
+async def get_reminder_settings(
+    session: AsyncSession, telegram_id: int
+) -> Optional[ReminderSettings]:
+    result = await session.execute(
+        select(
+            ReminderSchedule.enabled,
+            ReminderSchedule.interval_minutes,
+            ReminderSchedule.quiet_start,
+            ReminderSchedule.quiet_end,
+            ReminderSchedule.next_run_at,
+        ).where(ReminderSchedule.telegram_id == telegram_id)
+    )
+    row = result.one_or_none()
+    return ReminderSettings(*row) if row else None
+
+
+async def save_reminder_settings(
+    session: AsyncSession,
+    telegram_id: int,
+    *,
+    enabled: bool,
+    interval_minutes: Optional[int] = None,
+    quiet_start: Optional[int] = None,
+    quiet_end: Optional[int] = None,
+    tz: str = DEFAULT_TIMEZONE,
+) -> ReminderSettings:
+    """Сохраняет настройки в транзакции session (None — оставить текущее
+    значение или значение по умолчанию); после коммита напоминание
+    переставляется в планировщике. Тихие часы — по времени tz (часовой пояс
+    пользователя)."""
+    current = await get_reminder_settings(session, telegram_id)
+    defaults = current or ReminderSettings(
+        False, REMINDER_INTERVAL_MINUTES, REMINDER_QUIET_START, REMINDER_QUIET_END, None
+    )
+    settings = ReminderSettings(
+        enabled,
+        interval_minutes or defaults.interval_minutes,
+        defaults.quiet_start if quiet_start is None else quiet_start,
+        defaults.quiet_end if quiet_end is None else quiet_end,
+        None,
+    )
+    next_run_at = next_allowed_time(
+        datetime.now(timezone.utc) + timedelta(minutes=settings.interval_minutes),
+        settings.quiet_start,
+        settings.quiet_end,
+        get_zone(tz),
+    )
+    settings = settings._replace(next_run_at=next_run_at)
+
+    values = {
+        "enabled": settings.enabled,
+        "interval_minutes": settings.interval_minutes,
+        "quiet_start": settings.quiet_start,
+        "quiet_end": settings.quiet_end,
+        "next_run_at": settings.next_run_at,
+    }
+    stmt = insert(ReminderSchedule).values(telegram_id=telegram_id, **values)
+    await session.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[ReminderSchedule.telegram_id], set_=values
+        )
+    )
+    after_commit(
+        session,
+        lambda: reminder_scheduler.schedule(
+            telegram_id, next_run_at if enabled else None
+        ),
+    )
+    return settings
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    and_,
+    case,
+    cast,
+    delete,
+    func,
+    literal,
+    literal_column,
+    select,
+    text,
+)
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+from sqlalchemy.orm import aliased
+
+from config import REPORT_PERIODS, ROLLUP_INTERVAL
+from models.models import DailyTotal, PeriodTotal, RollupState, User
+
+logger = logging.getLogger("rollups")
+
+# Дневная свёртка — это daily_totals, её обновляет каждая запись в логи.
+PERIODS = ("week", "month")
+
+_STATE_NAME = "period_totals"
+# Транзакции, начатые до прошлого прогона, могли закоммитить updated_at
+# «в прошлом» — поэтому перечитываем изменения с запасом. Пересчёт периода
+# идемпотентен, повтор ничего не портит.
+_WATERMARK_OVERLAP = timedelta(minutes=5)
+# Ключ advisory-блокировки: свёртку считает только один процесс бота
+_LOCK_KEY = 0x726F6C6C  # "roll"
+
+
+class PeriodReport(NamedTuple):
+    period_start: date
+    days_logged: int
+    water_ml: int
+    calories_eaten: int
+    calories_burned: int
+    water_goal_days: int
+    calorie_goal_days: int
+
+    def average(self, value: int) -> int:
+        return round(value / self.days_logged) if self.days_logged else 0
+
+
+def rollup_statement(period: str, since: datetime | None):
+    """Пересчитывает свёртки периодов, в которых менялись дни после since."""
+    start = func.date_trunc(period, cast(DailyTotal.day, DateTime))
+    touched = select(
+        DailyTotal.telegram_id,
+        cast(start, Date).label("period_start"),
+        cast(start + literal_column(f"interval '1 {period}'"), Date).label(
+            "period_end"
+        ),
+    ).distinct()
+    if since is not None:
+        touched = touched.where(DailyTotal.updated_at > since)
+    touched = touched.subquery()
+
+    # Дни периода читаются по первичному ключу (telegram_id, day) диапазоном
+    day = aliased(DailyTotal, name="day_totals")
+    aggregated = (
+        select(
+            touched.c.telegram_id,
+            literal(period),
+            touched.c.period_start,
+            func.count(),
+            func.sum(day.water_ml),
+            func.sum(day.calories_eaten),
+            func.sum(day.calories_burned),
+            func.sum(case((day.water_ml >= User.water_goal, 1), else_=0)),
+            func.sum(
+                case(
+                    (
+                        and_(
+                            day.calories_eaten > 0,
+                            day.calories_eaten
+                            <= User.calorie_goal + day.calories_burned,
+                        ),
+                        1,
+                    ),
+                    else_=0,
+                )
+            ),
+        )
+        .select_from(touched)
+        .join(
+            day,
+            and_(
+                day.telegram_id == touched.c.telegram_id,
+                day.day >= touched.c.period_start,
+                day.day < touched.c.period_end,
+            ),
+        )
+        .join(User, User.telegram_id == touched.c.telegram_id)
+        .group_by(touched.c.telegram_id, touched.c.period_start)
+    )
+
+    columns = [
+        "telegram_id",
+        "period",
+        "period_start",
+        "days_logged",
+        "water_ml",
+        "calories_eaten",
+        "calories_burned",
+        "water_goal_days",
+        "calorie_goal_days",
+    ]
+    stmt = insert(PeriodTotal).from_select(columns, aggregated)
+    return stmt.on_conflict_do_update(
+        index_elements=[
+            PeriodTotal.telegram_id,
+            PeriodTotal.period,
+            PeriodTotal.period_start,
+        ],
+        set_={
+            **{name: stmt.excluded[name] for name in columns[3:]},
+            "updated_at": func.now(),
+        },
+    )
+
+
+async def refresh_rollups(conn: AsyncConnection) -> int:
+    """Досчитывает period_totals по изменениям daily_totals с прошлого прогона.
+
+    Возвращает количество пересчитанных строк.
+    """
+    if conn.dialect.name != "postgresql":
+        return 0
+
+    locked = await conn.execute(
+        text("SELECT pg_try_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+    )
+    if not locked.scalar():
+        return 0
+
+    now = (await conn.execute(select(func.now()))).scalar()
+    watermark = (
+        await conn.execute(
+            select(RollupState.watermark).where(RollupState.name == _STATE_NAME)
+        )
+    ).scalar()
+    since = watermark - _WATERMARK_OVERLAP if watermark else None
+
+    rows = 0
+    for period in PERIODS:
+        result = await conn.execute(rollup_statement(period, since))
+        rows += result.rowcount
+
+    state = insert(RollupState).values(name=_STATE_NAME, watermark=now)
+    await conn.execute(
+        state.on_conflict_do_update(
+            index_elements=[RollupState.name],
+            set_={"watermark": state.excluded.watermark},
+        )
+    )
+    return rows
+
+
+async def reset_rollups(session: AsyncSession, since: date | None = None) -> None:
+    """Удаляет свёртки периодов, задевающих дни начиная с since (без since —
+    все), и отметку: следующий refresh_rollups пересчитает все периоды.
+
+    Вызывается при пересчёте daily_totals, в той же транзакции session.
+    """
+    # Ждём прогон свёртки, если он идёт: иначе он запишет отметку поверх
+    await session.execute(
+        text("SELECT pg_advisory_xact_lock(:key)"), {"key": _LOCK_KEY}
+    )
+    for period in PERIODS:
+        cleanup = delete(PeriodTotal).where(PeriodTotal.period == period)
+        if since is not None:
+            cleanup = cleanup.where(
+                PeriodTotal.period_start
+                >= cast(func.date_trunc(period, cast(since, DateTime)), Date)
+            )
+        await session.execute(cleanup)
+    await session.execute(delete(RollupState).where(RollupState.name == _STATE_NAME))
+
+
+async def run_rollups(engine, interval: int = ROLLUP_INTERVAL) -> None:
+    """Фоновая задача: периодически обновляет недельные и месячные свёртки."""
+    while True:
+        try:
+            async with engine.begin() as conn:
+                rows = await refresh_rollups(conn)
+            if rows:
+                logger.info(f"📦 Обновлено свёрток: {rows}")
+        except Exception as e:
+            logger.exception(f"💥 Ошибка обновления свёрток: {e}")
+        await asyncio.sleep(interval)
+
+
+async def get_period_reports(
+    session: AsyncSession,
+    telegram_id: int,
+    period: str,
+    limit: int = REPORT_PERIODS,
+) -> list[PeriodReport]:
+    """Последние limit периодов пользователя, от нового к старому."""
+    result = await session.execute(
+        select(
+            PeriodTotal.period_start,
+            PeriodTotal.days_logged,
+            PeriodTotal.water_ml,
+            PeriodTotal.calories_eaten,
+            PeriodTotal.calories_burned,
+            PeriodTotal.water_goal_days,
+            PeriodTotal.calorie_goal_days,
+        )
+        .where(PeriodTotal.telegram_id == telegram_id)
+        .where(PeriodTotal.period == period)
+        .order_by(PeriodTotal.period_start.desc())
+        .limit(limit)
+    )
+    return [PeriodReport(*row) for row in result]
@@ -0,0 +1,100 @@
+"""Часовые пояса пользователей: определяются по городу из профиля.
+
+День пользователя (для daily_totals и колонки local_day в логах) начинается
+в полночь по его местному времени, а не по UTC.
+"""
+
+import re
+from datetime import date, datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from sqlalchemy import Date, cast, func
+
+from config import DEFAULT_TIMEZONE
+
+_ZONES = {
+    "Europe/Kaliningrad": ["калининград", "kaliningrad"],
+    "Europe/Moscow": [
+        "москва", "moscow", "санкт петербург", "петербург", "питер", "спб",
+        "saint petersburg", "st petersburg", "нижний новгород", "казань",
+        "ростов на дону", "краснодар", "сочи", "воронеж", "ярославль", "тула",
+        "рязань", "тверь", "мурманск", "архангельск", "петрозаводск",
+        "великий новгород", "псков", "смоленск", "калуга", "брянск", "курск",
+        "белгород", "липецк", "тамбов", "орел", "иваново", "владимир",
+        "кострома", "вологда", "киров", "чебоксары", "йошкар ола", "пенза",
+        "ставрополь", "махачкала", "грозный", "нальчик", "владикавказ",
+        "симферополь", "севастополь", "сыктывкар", "новороссийск",
+    ],
+    "Europe/Volgograd": ["волгоград"],
+    "Europe/Samara": ["самара", "тольятти", "ижевск"],
+    "Europe/Ulyanovsk": ["ульяновск"],
+    "Europe/Saratov": ["саратов"],
+    "Europe/Astrakhan": ["астрахань"],
+    "Asia/Yekaterinburg": [
+        "екатеринбург", "yekaterinburg", "челябинск", "пермь", "уфа", "тюмень",
+        "оренбург", "курган", "магнитогорск", "сургут", "нижневартовск",
+    ],
+    "Asia/Omsk": ["омск"],
+    "Asia/Novosibirsk": ["новосибирск", "novosibirsk"],
+    "Asia/Barnaul": ["барнаул", "горно алтайск"],
+    "Asia/Tomsk": ["томск"],
+    "Asia/Novokuznetsk": ["кемерово", "новокузнецк"],
+    "Asia/Krasnoyarsk": ["красноярск", "абакан", "норильск", "кызыл"],
+    "Asia/Irkutsk": ["иркутск", "улан удэ", "братск"],
+    "Asia/Chita": ["чита"],
+    "Asia/Yakutsk": ["якутск", "благовещенск"],
+    "Asia/Vladivostok": ["владивосток", "vladivostok", "хабаровск", "уссурийск", "находка"],
+    "Asia/Sakhalin": ["южно сахалинск"],
+    "Asia/Magadan": ["магадан"],
+    "Asia/Kamchatka": ["петропавловск камчатский"],
+    "Asia/Anadyr": ["анадырь"],
+    "Europe/Minsk": ["минск", "minsk"],
+    "Asia/Almaty": ["алматы", "алма ата", "almaty"],
+    "Asia/Tashkent": ["ташкент", "tashkent"],
+    "Asia/Bishkek": ["бишкек"],
+    "Asia/Tbilisi": ["тбилиси", "tbilisi"],
+    "Asia/Yerevan": ["ереван", "yerevan"],
+    "Asia/Baku": ["баку", "baku"],
+    "Europe/London": ["лондон", "london"],
+    "Europe/Berlin": ["берлин", "berlin"],
+    "America/New_York": ["нью йорк", "new york"],
+}
+
+# Нормализованное название города → часовой пояс IANA
+CITY_TIMEZONES = {city: zone for zone, cities in _ZONES.items() for city in cities}
+
+
+def normalize_city(city: str) -> str:
+    """Ключ города для справочника поясов и кэша погоды: нижний регистр,
+    ё → е, дефисы и лишние пробелы — в одиночный пробел."""
+    city = city.casefold().replace("ё", "е").replace("-", " ")
+    return re.sub(r"\s+", " ", city).strip()
+
+
+def timezone_for_city(city: str) -> str:
+    """Часовой пояс города или DEFAULT_TIMEZONE, если город неизвестен."""
+    return CITY_TIMEZONES.get(normalize_city(city), DEFAULT_TIMEZONE)
+
+
+@lru_cache(maxsize=None)
+def get_zone(name: str) -> ZoneInfo:
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError):
+        return ZoneInfo(DEFAULT_TIMEZONE)
+
+
+def local_day(tz: str, moment: datetime) -> date:
+    """Дата moment (aware datetime) по местному времени пользователя."""
+    return moment.astimezone(get_zone(tz)).date()
+
+
+def local_today(tz: str) -> date:
+    return datetime.now(get_zone(tz)).date()
+
+
+def local_day_sql(tz, moment=None):
+    """SQL-выражение: дата moment (по умолчанию now()) в часовом поясе tz
+    (колонка или строка). Только для Postgres."""
+    return cast(func.timezone(tz, moment if moment is not None else func.now()), Date)
@@ -0,0 +1,185 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import NamedTuple
+
+from sqlalchemy import delete, func, insert, literal, select, text, union_all
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from models.models import DailyTotal, FoodLog, WaterLog, WorkoutLog
+from services.rollups import reset_rollups
+
+
+class DayTotals(NamedTuple):
+    water_ml: int = 0
+    calories_eaten: int = 0
+    calories_burned: int = 0
+
+
+def _accumulate(stmt) -> dict:
+    """SET-часть upsert: прибавить новые значения к уже накопленным."""
+    return {
+        "water_ml": DailyTotal.water_ml + stmt.excluded.water_ml,
+        "calories_eaten": DailyTotal.calories_eaten + stmt.excluded.calories_eaten,
+        "calories_burned": DailyTotal.calories_burned + stmt.excluded.calories_burned,
+        "updated_at": func.now(),
+    }
+
+
+def daily_totals_upsert(
+    telegram_id: int,
+    *,
+    water_ml: int = 0,
+    calories_eaten: int = 0,
+    calories_burned: int = 0,
+    day: date,
+):
+    """Upsert итогов дня с RETURNING новых значений."""
+    stmt = postgresql.insert(DailyTotal).values(
+        telegram_id=telegram_id,
+        day=day,
+        water_ml=water_ml,
+        calories_eaten=calories_eaten,
+        calories_burned=calories_burned,
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[DailyTotal.telegram_id, DailyTotal.day],
+        set_=_accumulate(stmt),
+    ).returning(
+        DailyTotal.water_ml, DailyTotal.calories_eaten, DailyTotal.calories_burned
+    )
+
+
+async def add_to_daily_totals(
+    session: AsyncSession,
+    telegram_id: int,
+    *,
+    water_ml: int = 0,
+    calories_eaten: int = 0,
+    calories_burned: int = 0,
+    day: date,
+) -> DayTotals:
+    """Атомарно прибавляет значения к итогам дня (day — местная дата
+    пользователя) и возвращает новые итоги.
+
+    Выполняется в транзакции переданной сессии, коммит остаётся за вызывающим.
+    """
+    result = await session.execute(
+        daily_totals_upsert(
+            telegram_id,
+            water_ml=water_ml,
+            calories_eaten=calories_eaten,
+            calories_burned=calories_burned,
+            day=day,
+        )
+    )
+    return DayTotals(*result.one())
+
+
+async def add_many_to_daily_totals(session: AsyncSession, deltas: list[dict]) -> None:
+    """Пакетный вариант add_to_daily_totals: deltas — словари с telegram_id, day,
+    water_ml, calories_eaten, calories_burned."""
+    if not deltas:
+        return
+    stmt = postgresql.insert(DailyTotal)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyTotal.telegram_id, DailyTotal.day],
+        set_=_accumulate(stmt),
+    )
+    await session.execute(stmt, deltas)
+
+
+async def get_daily_totals(
+    session: AsyncSession, telegram_id: int, day: date
+) -> DayTotals:
+    result = await session.execute(
+        select(
+            DailyTotal.water_ml, DailyTotal.calories_eaten, DailyTotal.calories_burned
+        )
+        .where(DailyTotal.telegram_id == telegram_id)
+        .where(DailyTotal.day == day)
+    )
+    row = result.one_or_none()
+    return DayTotals(*row) if row else DayTotals()
+
+
+def aggregate_logs_statement(
+    since: date | None = None, telegram_id: int | None = None
+):
+    """Суммы по сырым логам в разрезе (telegram_id, local_day)."""
+    parts = [
+        select(
+            WaterLog.telegram_id,
+            WaterLog.local_day.label("day"),
+            WaterLog.quantity.label("water_ml"),
+            literal(0).label("calories_eaten"),
+            literal(0).label("calories_burned"),
+        ),
+        select(
+            FoodLog.telegram_id,
+            FoodLog.local_day.label("day"),
+            literal(0).label("water_ml"),
+            FoodLog.calories.label("calories_eaten"),
+            literal(0).label("calories_burned"),
+        ),
+        select(
+            WorkoutLog.telegram_id,
+            WorkoutLog.local_day.label("day"),
+            literal(0).label("water_ml"),
+            literal(0).label("calories_eaten"),
+            WorkoutLog.calories_burned.label("calories_burned"),
+        ),
+    ]
+    if since is not None:
+        # Местный день since начинается не раньше since − 14 ч по UTC (UTC+14);
+        # фильтр по logged_at нужен, чтобы отсекались старые партиции.
+        since_start = datetime.combine(since, time.min, tzinfo=timezone.utc) - timedelta(
+            hours=14
+        )
+        for i, model in enumerate((WaterLog, FoodLog, WorkoutLog)):
+            parts[i] = parts[i].where(
+                model.local_day >= since, model.logged_at >= since_start
+            )
+    if telegram_id is not None:
+        for i, model in enumerate((WaterLog, FoodLog, WorkoutLog)):
+            parts[i] = parts[i].where(model.telegram_id == telegram_id)
+
+    logs = union_all(*parts).subquery()
+    return select(
+        logs.c.telegram_id,
+        logs.c.day,
+        func.sum(logs.c.water_ml),
+        func.sum(logs.c.calories_eaten),
+        func.sum(logs.c.calories_burned),
+    ).group_by(logs.c.telegram_id, logs.c.day)
+
+
+async def rebuild_daily_totals(session: AsyncSession, since: date | None = None) -> int:
+    """Пересчитывает daily_totals из сырых логов (целиком или начиная с since)
+    и сбрасывает свёртки периодов. Выполнять в одной транзакции session.
+
+    Возвращает количество записанных строк.
+    """
+    # Запись в логи ждёт конца пересчёта и прибавляет свой upsert к уже
+    # пересчитанной строке — иначе её приращение могло потеряться.
+    # Чтение daily_totals (прогресс, отчёты) при этом не блокируется.
+    await session.execute(text("LOCK TABLE daily_totals IN EXCLUSIVE MODE"))
+
+    cleanup = delete(DailyTotal)
+    if since is not None:
+        cleanup = cleanup.where(DailyTotal.day >= since)
+    await session.execute(cleanup)
+
+    result = await session.execute(
+        insert(DailyTotal).from_select(
+            [
+                DailyTotal.telegram_id,
+                DailyTotal.day,
+                DailyTotal.water_ml,
+                DailyTotal.calories_eaten,
+                DailyTotal.calories_burned,
+            ],
+            aggregate_logs_statement(since),
+        )
+    )
+    await reset_rollups(session, since)
+    return result.rowcount
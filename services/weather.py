@@ -1,9 +1,35 @@
-import aiohttp
+import asyncio
+import logging
+import time
+from typing import NamedTuple
 
-from config import WEATHER_API_KEY
+from cachetools import TTLCache
 
+from config import (
+    WEATHER_API_KEY,
+    WEATHER_CACHE_SIZE,
+    WEATHER_CACHE_TTL,
+    WEATHER_STALE_TTL,
+)
+from services.http import http_client
+from services.timezones import normalize_city
 
-async def get_temperature(city: str) -> float | None:
+logger = logging.getLogger("weather")
+
+
+class _CachedTemperature(NamedTuple):
+    temperature: float
+    fetched_at: float
+
+
+# Город → последняя известная температура. Запись считается свежей
+# WEATHER_CACHE_TTL секунд, после этого отдаётся как устаревшая и обновляется
+# в фоне; из кэша удаляется через WEATHER_STALE_TTL.
+_weather_cache = TTLCache(maxsize=WEATHER_CACHE_SIZE, ttl=WEATHER_STALE_TTL)
+_in_flight: dict[str, asyncio.Task] = {}
+
+
+async def fetch_temperature(city: str) -> float | None:
     api_key = WEATHER_API_KEY
     if not api_key or not city:
         return None
@@ -17,12 +43,52 @@ async def get_temperature(city: str) -> float | None:
     }
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                if resp.status == 200:
-                    data = await resp.json()
-                    return round(data["main"]["temp"], 1)
-                else:
-                    return None
+        async with http_client.get("openweather", url, params=params) as resp:
+            if resp.status == 200:
+                data = await resp.json()
+                return round(data["main"]["temp"], 1)
+            else:
+                return None
     except Exception:
         return None
+
+
+def remember_temperature(city: str, temperature: float) -> None:
+    _weather_cache[normalize_city(city)] = _CachedTemperature(
+        temperature, time.monotonic()
+    )
+
+
+async def _fetch_and_store(key: str, city: str) -> float | None:
+    temperature = await fetch_temperature(city)
+    if temperature is not None:
+        remember_temperature(city, temperature)
+    return temperature
+
+
+def _refresh(key: str, city: str) -> asyncio.Task:
+    """Один запрос на город: параллельные вызовы ждут общую задачу."""
+    task = _in_flight.get(key)
+    if task is None:
+        task = asyncio.create_task(_fetch_and_store(key, city))
+        _in_flight[key] = task
+        task.add_done_callback(lambda _: _in_flight.pop(key, None))
+    return task
+
+
+async def get_temperature(city: str) -> float | None:
+    if not city:
+        return None
+
+    key = normalize_city(city)
+    cached = _weather_cache.get(key)
+    if cached is not None:
+        if WEATHER_API_KEY and time.monotonic() - cached.fetched_at >= WEATHER_CACHE_TTL:
+            logger.debug(f"🔄 Обновляем погоду для {key} в фоне")
+            _refresh(key, city)
+        return cached.temperature
+    if not WEATHER_API_KEY:
+        return None
+
+    # shield: отмена одного ожидающего не должна отменять общий запрос
+    return await asyncio.shield(_refresh(key, city))
@@ -1,33 +1,160 @@
+import asyncio
 from cachetools import TTLCache
-from typing import Optional, Dict, Any
+from typing import NamedTuple, Optional
+from sqlalchemy.ext.asyncio import AsyncSession
 from models.models import User
-from database import AsyncSessionLocal
+from database import mark_written, read_scope
+from config import PROFILE_INVALIDATION_CHANNEL, USER_CACHE_SIZE, USER_CACHE_TTL
+from services.progress import (
+    PROGRESS_INVALIDATION_PREFIX,
+    clear_progress_cache,
+    invalidate_progress,
+    parse_progress_invalidation,
+)
+from services.redis_client import get_redis
 import logging
 
 logger = logging.getLogger("user_cache")
 
-# Кэш: максимум 1000 пользователей, живут 10 минут (600 сек)
-_user_profile_cache = TTLCache(maxsize=1000, ttl=600)
 
+class UserProfile(NamedTuple):
+    """Неизменяемая копия профиля: только поля, которые читают хендлеры."""
 
-async def get_user_profile(telegram_id: int) -> Optional[Dict[str, Any]]:
-    """Возвращает словарь с профилем пользователя или None, если не найден."""
-    if telegram_id in _user_profile_cache:
+    telegram_id: int
+    weight: int
+    height: int
+    age: int
+    city: str
+    gender: str
+    activity_minutes: int
+    calorie_goal: int
+    water_goal: int
+    timezone: str
+
+    @classmethod
+    def from_user(cls, user: User) -> "UserProfile":
+        return cls(*(getattr(user, field) for field in cls._fields))
+
+
+class _CountingTTLCache(TTLCache):
+    """TTLCache со счётчиками вытеснений и истечений."""
+
+    def __init__(self, maxsize, ttl):
+        super().__init__(maxsize=maxsize, ttl=ttl)
+        self.evictions = 0
+        self.expirations = 0
+
+    def popitem(self):
+        item = super().popitem()
+        self.evictions += 1
+        return item
+
+    def clear(self):
+        # clear() вытесняет через popitem — это не вытеснения по размеру
+        evictions = self.evictions
+        super().clear()
+        self.evictions = evictions
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        self.expirations += len(expired)
+        return expired
+
+
+# Записи фиксированного размера, поэтому лимит по числу записей ограничивает
+# и память кэша.
+_user_profile_cache = _CountingTTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL)
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+async def get_user_profile(
+    telegram_id: int, session: Optional[AsyncSession] = None
+) -> Optional[UserProfile]:
+    """Возвращает профиль пользователя или None, если не найден.
+
+    session — сессия обновления из DbSessionMiddleware: при промахе кэша
+    читаем через неё, если реплика недоступна.
+    """
+    profile = _user_profile_cache.get(telegram_id)
+    if profile is not None:
+        _cache_stats["hits"] += 1
         logger.debug(f"✅ Кэш hit для пользователя {telegram_id}")
-        return _user_profile_cache[telegram_id]
+        return profile
 
+    _cache_stats["misses"] += 1
     logger.debug(f"🔍 Кэш miss для пользователя {telegram_id} — читаем из БД")
-    async with AsyncSessionLocal() as session:
-        user = await session.get(User, telegram_id)
+    async with read_scope(session, telegram_id) as reader:
+        user = await reader.get(User, telegram_id)
         if not user:
             return None
 
-        _user_profile_cache[telegram_id] = user
-        return user
+        profile = UserProfile.from_user(user)
+        _user_profile_cache[telegram_id] = profile
+        return profile
 
 
 def invalidate_user_cache(telegram_id: int) -> None:
-    """Удаляет профиль из кэша (вызывать после обновления профиля)."""
-    if telegram_id in _user_profile_cache:
-        del _user_profile_cache[telegram_id]
+    """Удаляет профиль из кэша этого процесса."""
+    if _user_profile_cache.pop(telegram_id, None) is not None:
         logger.debug(f"🧹 Кэш инвалидирован для пользователя {telegram_id}")
+    invalidate_progress(telegram_id)
+
+
+async def broadcast_user_invalidation(telegram_id: int) -> None:
+    """Инвалидирует профиль здесь и во всех остальных воркерах (через Redis)."""
+    invalidate_user_cache(telegram_id)
+    redis = get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.publish(PROFILE_INVALIDATION_CHANNEL, str(telegram_id))
+    except Exception as e:
+        # Другие воркеры догонят по TTL кэша
+        logger.warning(f"⚠️ Не удалось разослать инвалидацию профиля: {e}")
+
+
+async def listen_user_invalidations() -> None:
+    """Фоновая задача: применяет инвалидации профилей и прогресса от других
+    воркеров."""
+    redis = get_redis()
+    if redis is None:
+        return
+    while True:
+        try:
+            async with redis.pubsub() as pubsub:
+                await pubsub.subscribe(PROFILE_INVALIDATION_CHANNEL)
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    data = message["data"]
+                    if isinstance(data, bytes):
+                        data = data.decode()
+                    if data.startswith(PROGRESS_INVALIDATION_PREFIX):
+                        # Новые записи в логах: сбрасываем только снимок прогресса
+                        for telegram_id in parse_progress_invalidation(data):
+                            mark_written(telegram_id)
+                            invalidate_progress(telegram_id)
+                        continue
+                    telegram_id = int(data)
+                    # Запись была в основной БД: пока реплика не догнала,
+                    # перечитываем оттуда, иначе закэшируем старый профиль
+                    mark_written(telegram_id)
+                    invalidate_user_cache(telegram_id)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning(f"⚠️ Подписка на инвалидации прервана: {e}")
+            # Пока не подписаны, события могли потеряться
+            _user_profile_cache.clear()
+            clear_progress_cache()
+            await asyncio.sleep(1)
+
+
+def user_cache_stats() -> dict:
+    return {
+        **_cache_stats,
+        "evictions": _user_profile_cache.evictions,
+        "expirations": _user_profile_cache.expirations,
+        "size": len(_user_profile_cache),
+        "maxsize": _user_profile_cache.maxsize,
+    }
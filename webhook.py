@@ -0,0 +1,77 @@
+import asyncio
+import logging
+import signal
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+
+from config import (
+    WEBAPP_HOST,
+    WEBAPP_PORT,
+    WEBHOOK_BASE_URL,
+    WEBHOOK_DRAIN_TIMEOUT,
+    WEBHOOK_MAX_CONCURRENCY,
+    WEBHOOK_PATH,
+    WEBHOOK_SECRET,
+)
+from middlewares.concurrency import ConcurrencyLimitMiddleware
+
+logger = logging.getLogger("webhook")
+
+
+def create_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """aiohttp-приложение, принимающее обновления Telegram на WEBHOOK_PATH."""
+    limiter = ConcurrencyLimitMiddleware(WEBHOOK_MAX_CONCURRENCY)
+    dp.update.outer_middleware(limiter)
+
+    async def set_webhook(bot: Bot):
+        if not WEBHOOK_BASE_URL:
+            logger.info("ℹ️ WEBHOOK_BASE_URL не задан — вебхук в Telegram не регистрируем")
+            return
+        await bot.set_webhook(
+            WEBHOOK_BASE_URL.rstrip("/") + WEBHOOK_PATH,
+            secret_token=WEBHOOK_SECRET or None,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+
+    async def drain(app: web.Application):
+        # Сервер уже не принимает соединения — дорабатываем принятые обновления
+        await limiter.drain(WEBHOOK_DRAIN_TIMEOUT)
+
+    dp.startup.register(set_webhook)
+
+    app = web.Application()
+    # Регистрируется первым, чтобы отработать до закрытия сессии бота
+    # и shutdown-хуков диспетчера.
+    app.on_shutdown.append(drain)
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET or None,
+        handle_in_background=True,
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+    return app
+
+
+async def run_webhook(dp: Dispatcher, bot: Bot) -> None:
+    app = create_app(dp, bot)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, WEBAPP_HOST, WEBAPP_PORT)
+    await site.start()
+    logger.info(f"🌐 Вебхук слушает {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    try:
+        await stop.wait()
+    finally:
+        await runner.cleanup()